@@ -3,14 +3,21 @@ ASGI config for LittleLemon project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the ``api/orders/events`` stream through this entry point (for example
+``uvicorn LittleLemon.asgi:application``): each connected client is then an
+idle coroutine rather than a blocked worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.apps import apps
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "LittleLemon.settings")
 
 application = get_asgi_application()
+
+apps.get_app_config("LittleLemonAPI").warm_up()
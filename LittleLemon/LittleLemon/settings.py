@@ -45,7 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "LittleLemonAPI.load_shedding.ConcurrencyLimitMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "LittleLemonAPI.profiling.ProfilingMiddleware",
+    "LittleLemonAPI.slow_queries.SlowQueryMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -81,6 +84,13 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Take the write lock when a transaction starts, so concurrent
+        # checkouts queue on the busy timeout instead of failing to upgrade
+        # a read lock.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        # A file rather than the in-memory default, so the concurrency tests
+        # can run writers on several connections.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
 
@@ -143,3 +153,110 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_THROTTLE_RATES": {"anon": "30/minute", "user": "100/minute"},
 }
+
+# Route new orders to the least loaded delivery crew member after checkout.
+# Orders can also be assigned in batches with `manage.py assign_orders`.
+AUTO_ASSIGN_DELIVERY_CREW = False
+
+# Seconds between keepalive comments on idle `api/orders/events` streams.
+ORDER_EVENTS_KEEPALIVE = 15
+
+# Responses to requests carrying an `Idempotency-Key` header are replayed for
+# this many seconds. A key whose request has not finished after the lock
+# timeout is considered abandoned and may be reused.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# `manage.py archive_orders` moves delivered orders older than this many days
+# into the archive tables.
+ORDER_ARCHIVE_AFTER_DAYS = 90
+
+# Background jobs run by `manage.py run_jobs`. A failed job is retried after
+# JOB_RETRY_DELAY seconds, doubling each attempt up to JOB_RETRY_MAX_DELAY,
+# and is given up after JOB_MAX_ATTEMPTS. A job still running after
+# JOB_LEASE seconds is assumed lost with its worker and handed out again.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+JOB_LEASE = 5 * 60
+
+# Order events are also delivered to these URLs (kitchen display, POS) by
+# `manage.py dispatch_outbox`, as JSON batches of up to OUTBOX_BATCH_SIZE.
+# A failed batch is retried after OUTBOX_RETRY_DELAY seconds, doubling up to
+# OUTBOX_RETRY_MAX_DELAY, and dropped after OUTBOX_MAX_ATTEMPTS.
+ORDER_WEBHOOK_URLS = []
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_TIMEOUT = 10
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETRY_DELAY = 5
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+
+# Answer If-None-Match on the menu item and category endpoints with 304 while
+# the catalog is unchanged. The catalog version is kept in the default cache,
+# so this needs a cache shared by all processes: with a per-process cache, a
+# write bumps the version in one process only and the others keep answering
+# 304 for the old catalog.
+CATALOG_ETAGS = False
+
+# Where carts are kept between edits. CacheCartStorage keeps them in the
+# default cache and writes them to the database at checkout and on
+# `manage.py flush_carts`; it needs a cache shared by all processes.
+CART_STORAGE = "LittleLemonAPI.cart_storage.DatabaseCartStorage"
+
+# Carts untouched for this many seconds are abandoned; `manage.py
+# expire_carts` deletes them. Cached carts expire after the same time.
+CART_TTL = 7 * 24 * 60 * 60
+CART_CACHE_TIMEOUT = CART_TTL
+
+# Requests profiled by LittleLemonAPI.profiling.ProfilingMiddleware, on a
+# superuser's request or for this fraction of all requests, are written to
+# PROFILE_DIR. Only the newest PROFILE_KEEP profiles are kept.
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_KEEP = 200
+
+# Queries taking at least SLOW_QUERY_THRESHOLD seconds are logged, with their
+# query plan and the view that ran them, to SLOW_QUERY_LOG; summarize it with
+# `manage.py slow_query_report`. The log is rotated once it outgrows
+# SLOW_QUERY_LOG_MAX_BYTES. Set the threshold to None to turn this off.
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = BASE_DIR / "slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Writes the slow query log of a test run to a temporary directory.
+TEST_RUNNER = "LittleLemon.test_runner.LittleLemonTestRunner"
+
+# Concurrent identical GETs to the menu item and order lists share one
+# computation. A request waits at most this many seconds for it before
+# computing its own response.
+COALESCE_TIMEOUT = 10
+
+# Each process has one adaptive concurrency limit for all routes, between
+# CONCURRENCY_LIMIT_MIN and CONCURRENCY_LIMIT_MAX. It grows while latency
+# stays within CONCURRENCY_LATENCY_TOLERANCE times the lowest seen for each
+# route and is multiplied by CONCURRENCY_BACKOFF when it does not. Checkouts
+# and order updates are always admitted; other requests get a 503 asking to
+# retry after LOAD_SHED_RETRY_AFTER seconds once all but CONCURRENCY_RESERVE
+# of the limit is in use.
+CONCURRENCY_LIMIT_INITIAL = 20
+CONCURRENCY_LIMIT_MIN = 2
+CONCURRENCY_LIMIT_MAX = 200
+CONCURRENCY_LATENCY_TOLERANCE = 2.0
+CONCURRENCY_BACKOFF = 0.9
+CONCURRENCY_RESERVE = 0.2
+LOAD_SHED_RETRY_AFTER = 1
+
+# `api/batch` accepts up to BATCH_MAX_REQUESTS sub-requests and runs
+# parallel reads on up to BATCH_MAX_WORKERS threads.
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# Workers started through wsgi.py or asgi.py warm their caches before taking
+# traffic: group ids, the catalog version, and WARMUP_PATHS served
+# in-process. `manage.py warmup` does the same for the shared cache.
+WARMUP_ON_START = False
+WARMUP_PATHS = [
+    "/api/categories/",
+    "/api/menu-items/",
+    "/api/menu-items/?featured=true",
+]
@@ -0,0 +1,52 @@
+"""
+Settings for workers that only serve the API.
+
+Select them with DJANGO_SETTINGS_MODULE=LittleLemon.settings_api in front of
+either wsgi.py or asgi.py. API clients authenticate with tokens, so the admin,
+sessions, messages, CSRF and clickjacking protection and the browsable API
+are left out: fewer apps to load at startup and less middleware per request.
+Run the admin from a worker using the default settings.
+"""
+
+from .settings import *
+from .settings import INSTALLED_APPS, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    app
+    for app in INSTALLED_APPS
+    if app
+    not in {
+        "django.contrib.admin",
+        "django.contrib.messages",
+        "django.contrib.sessions",
+        "django.contrib.staticfiles",
+    }
+]
+
+MIDDLEWARE = [
+    "LittleLemonAPI.load_shedding.ConcurrencyLimitMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "LittleLemonAPI.profiling.ProfilingMiddleware",
+    "LittleLemonAPI.slow_queries.SlowQueryMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "LittleLemon.urls_api"
+
+# Only djoser's emails are rendered from templates.
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "APP_DIRS": True,
+    },
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "rest_framework.authentication.TokenAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+}
+
+WARMUP_ON_START = True
@@ -0,0 +1,24 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class LittleLemonTestRunner(DiscoverRunner):
+    """Keep the test run's slow query log out of the working tree.
+
+    The wrapper stays installed, so the slow query tests still exercise it,
+    but entries from the lock waits of the concurrency tests go to a
+    temporary directory that is removed afterwards.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.log_dir = tempfile.mkdtemp(prefix="littlelemon-tests-")
+        settings.SLOW_QUERY_LOG = Path(self.log_dir) / "slow_queries.log"
+
+    def teardown_test_environment(self, **kwargs):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
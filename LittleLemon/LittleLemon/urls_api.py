@@ -0,0 +1,12 @@
+"""
+URL configuration for API-only workers; see settings_api.py.
+"""
+
+from django.urls import include, path, re_path
+from rest_framework.authtoken.views import obtain_auth_token
+
+urlpatterns = [
+    re_path(r"^api/", include("djoser.urls")),
+    path("token/login", obtain_auth_token),
+    path("api/", include("LittleLemonAPI.urls")),
+]
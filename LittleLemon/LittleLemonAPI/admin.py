@@ -1,13 +1,79 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 
 from . import models
 
-admin.site.register(
-    [
-        models.Category,
-        models.MenuItem,
-        models.Cart,
-        models.Order,
-        models.OrderItem,
-    ]
-)
+
+class CappedCountPaginator(Paginator):
+    """Count at most ``cap`` rows instead of the whole table.
+
+    Past the cap the changelist shows the first ``cap`` rows' worth of pages;
+    filter or search to reach the rest.
+    """
+
+    cap = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[: self.cap].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(models.Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ["title", "slug"]
+    search_fields = ["title"]
+
+
+@admin.register(models.MenuItem)
+class MenuItemAdmin(admin.ModelAdmin):
+    list_display = ["title", "category", "price", "featured", "stock", "popularity"]
+    list_select_related = ["category"]
+    list_filter = ["featured"]
+    search_fields = ["title"]
+    autocomplete_fields = ["category"]
+
+
+@admin.register(models.Cart)
+class CartAdmin(LargeTableAdmin):
+    list_display = ["id", "user", "menuitem", "quantity", "price", "updated"]
+    list_select_related = ["user", "menuitem"]
+    raw_id_fields = ["user", "menuitem"]
+    date_hierarchy = "updated"
+
+
+class OrderItemInline(admin.TabularInline):
+    # Order items are price snapshots taken at checkout, so they are shown
+    # read-only, from one query, rather than with a widget per row.
+    model = models.OrderItem
+    fields = readonly_fields = ["menuitem", "quantity", "unit_price", "price"]
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("menuitem")
+
+
+@admin.register(models.Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ["id", "user", "delivery_crew", "status", "total", "date"]
+    list_select_related = ["user", "delivery_crew"]
+    list_filter = ["status"]
+    date_hierarchy = "date"
+    raw_id_fields = ["user", "delivery_crew"]
+    inlines = [OrderItemInline]
+
+
+@admin.register(models.OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ["id", "order", "menuitem", "quantity", "price"]
+    list_select_related = ["order", "menuitem"]
+    raw_id_fields = ["order", "menuitem"]
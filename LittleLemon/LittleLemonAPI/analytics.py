@@ -0,0 +1,159 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest
+
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    DailyMenuItemSales,
+    DailySales,
+    MenuItem,
+    Order,
+    OrderItem,
+)
+
+
+def increment(model, lookup: dict, **deltas) -> None:
+    """Add ``deltas`` to the row matching ``lookup``, creating it if needed.
+
+    Only positive deltas create rows; a decrement for a row that was never
+    recorded is dropped and left to ``rebuild_sales_rollups``. Decrements are
+    clamped at zero, for orders the row never counted.
+    """
+    changes = {
+        field: F(field) + value
+        if value >= 0
+        else Greatest(
+            F(field) + value, Value(0), output_field=model._meta.get_field(field)
+        )
+        for field, value in deltas.items()
+    }
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    if any(value < 0 for value in deltas.values()):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # A concurrent checkout created the row first.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record_order_sales(order, lines, sign: int = 1) -> None:
+    """Apply an order to the daily rollups.
+
+    ``lines`` holds ``(menuitem_id, quantity, revenue)`` tuples. Use
+    ``sign=-1`` to take a deleted order back out.
+    """
+    increment(DailySales, {"date": order.date}, orders=sign, revenue=sign * order.total)
+    for menuitem_id, quantity, revenue in lines:
+        increment(
+            DailyMenuItemSales,
+            {"date": order.date, "menuitem_id": menuitem_id},
+            quantity=sign * quantity,
+            revenue=sign * revenue,
+        )
+        MenuItem.objects.filter(pk=menuitem_id).update(
+            popularity=Greatest(F("popularity") + sign * quantity, Value(0))
+        )
+
+
+def order_lines(order) -> list[tuple]:
+    return list(
+        OrderItem.objects.filter(order=order).values_list(
+            "menuitem_id", "quantity", "price"
+        )
+    )
+
+
+def _merge_rows(querysets, keys: tuple) -> list[dict]:
+    """Sum aggregate rows from several querysets that share ``keys``."""
+    merged = {}
+    for queryset in querysets:
+        for row in queryset:
+            key = tuple(row[name] for name in keys)
+            if key not in merged:
+                merged[key] = row
+                continue
+            for name, value in row.items():
+                if name not in keys:
+                    merged[key][name] += value
+    return list(merged.values())
+
+
+@transaction.atomic
+def rebuild_sales_rollups(start=None, end=None) -> None:
+    # Archived orders keep counting towards the rollups.
+    orders = [Order.objects.all(), ArchivedOrder.objects.all()]
+    items = [OrderItem.objects.all(), ArchivedOrderItem.objects.all()]
+    daily = DailySales.objects.all()
+    daily_items = DailyMenuItemSales.objects.all()
+    if start is not None:
+        orders = [queryset.filter(date__gte=start) for queryset in orders]
+        items = [queryset.filter(order__date__gte=start) for queryset in items]
+        daily = daily.filter(date__gte=start)
+        daily_items = daily_items.filter(date__gte=start)
+    if end is not None:
+        orders = [queryset.filter(date__lte=end) for queryset in orders]
+        items = [queryset.filter(order__date__lte=end) for queryset in items]
+        daily = daily.filter(date__lte=end)
+        daily_items = daily_items.filter(date__lte=end)
+
+    daily.delete()
+    daily_items.delete()
+    DailySales.objects.bulk_create(
+        (
+            DailySales(**row)
+            for row in _merge_rows(
+                (
+                    queryset.values("date").annotate(
+                        orders=Count("id"), revenue=Sum("total")
+                    )
+                    for queryset in orders
+                ),
+                ("date",),
+            )
+        ),
+        batch_size=1000,
+    )
+    DailyMenuItemSales.objects.bulk_create(
+        (
+            DailyMenuItemSales(
+                date=row["order__date"],
+                menuitem_id=row["menuitem"],
+                quantity=row["units"],
+                revenue=row["sales"],
+            )
+            for row in _merge_rows(
+                (
+                    queryset.values("order__date", "menuitem").annotate(
+                        units=Sum("quantity"), sales=Sum("price")
+                    )
+                    for queryset in items
+                ),
+                ("order__date", "menuitem"),
+            )
+        ),
+        batch_size=1000,
+    )
+
+
+@transaction.atomic
+def rebuild_popularity() -> None:
+    sold = Counter()
+    for model in (OrderItem, ArchivedOrderItem):
+        sold.update(
+            dict(model.objects.values_list("menuitem").annotate(Sum("quantity")))
+        )
+    MenuItem.objects.exclude(pk__in=sold).update(popularity=0)
+    MenuItem.objects.bulk_update(
+        [
+            MenuItem(pk=menuitem_id, popularity=units)
+            for menuitem_id, units in sold.items()
+        ],
+        ["popularity"],
+        batch_size=500,
+    )
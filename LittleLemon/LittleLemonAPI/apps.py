@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class LittlelemonapiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "LittleLemonAPI"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .slow_queries import install
+
+        connection_created.connect(install)
+
+    def warm_up(self):
+        """Warm this worker's caches before it takes traffic.
+
+        wsgi.py and asgi.py call this once the application is loaded, when
+        WARMUP_ON_START is set; ready() is too early to query the database.
+        """
+        if settings.WARMUP_ON_START:
+            from django.db import connections
+
+            from .warmup import warm_up
+
+            warm_up()
+            # Don't hand the connections opened here to forked workers.
+            connections.close_all()
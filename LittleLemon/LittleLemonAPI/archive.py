@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models import Max
+
+from .documents import build_documents, document_orders
+from .models import ArchivedOrder, ArchivedOrderItem, Order
+
+
+def archive_orders(cutoff, batch_size: int = 500) -> int:
+    """Move delivered orders dated before ``cutoff`` into the archive tables.
+
+    Each batch is copied and deleted from the hot tables in one transaction,
+    so an order is always in exactly one of them.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            orders = list(
+                document_orders()
+                .select_for_update(of=("self",))
+                .filter(status=True, date__lt=cutoff)
+                .order_by("id")[:batch_size]
+            )
+            if not orders:
+                return archived
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(
+                    id=document.order_id,
+                    user_id=document.user_id,
+                    delivery_crew_id=document.delivery_crew_id,
+                    status=document.status,
+                    total=document.total,
+                    date=document.date,
+                    document=document.document,
+                )
+                for document in build_documents(orders)
+            )
+            ArchivedOrderItem.objects.bulk_create(
+                ArchivedOrderItem(
+                    order_id=order.id,
+                    menuitem_id=item.menuitem_id,
+                    quantity=item.quantity,
+                    unit_price=item.unit_price,
+                    price=item.price,
+                )
+                for order in orders
+                for item in order.orderitem_set.all()
+            )
+            Order.objects.filter(id__in=[order.id for order in orders]).delete()
+        archived += len(orders)
+
+
+def archive_watermark():
+    """Return the newest order date in the archive, or ``None`` if it is empty."""
+    return ArchivedOrder.objects.aggregate(Max("date"))["date__max"]
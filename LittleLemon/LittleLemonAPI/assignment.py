@@ -0,0 +1,148 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Value, When
+from django.db.models.functions import Greatest
+
+from .documents import refresh_order_documents
+from .events import order_events, publish_events
+from .helpers import get_group_id
+from .models import DeliveryCrewLoad, Order
+
+
+def crew_load_delta(before, after) -> Counter:
+    """Return the open-order load change per crew member.
+
+    ``before`` and ``after`` are ``(delivery_crew_id, status)`` pairs; either
+    may be ``None`` for a created or deleted order.
+    """
+    delta = Counter()
+    if before is not None and before[0] is not None and not before[1]:
+        delta[before[0]] -= 1
+    if after is not None and after[0] is not None and not after[1]:
+        delta[after[0]] += 1
+    return delta
+
+
+def adjust_crew_loads(delta: Counter) -> None:
+    delta = {crew_id: change for crew_id, change in delta.items() if change}
+    if not delta:
+        return
+    DeliveryCrewLoad.objects.bulk_create(
+        [DeliveryCrewLoad(user_id=crew_id) for crew_id in delta],
+        ignore_conflicts=True,
+    )
+    by_change = defaultdict(list)
+    for crew_id, change in delta.items():
+        by_change[change].append(crew_id)
+    for change, crew_ids in by_change.items():
+        # Clamp at zero so orders assigned before the counters existed can
+        # never drive a load negative; `assign_orders --rebuild-loads` resyncs.
+        DeliveryCrewLoad.objects.filter(user_id__in=crew_ids).update(
+            open_orders=Greatest(F("open_orders") + change, Value(0))
+        )
+
+
+def assign_open_orders(batch_size: int = 500, limit: int | None = None) -> int:
+    """Route unassigned open orders to the least loaded delivery crew members.
+
+    Each batch reads the ``DeliveryCrewLoad`` counters of only as many crew
+    members as it has orders, the least loaded ones, through the
+    ``(open_orders, user)`` index: routing n orders through the heap can
+    never reach past the n least loaded. The batch is written back with a
+    single UPDATE, so the cost of a batch does not grow with the number of
+    crew members.
+    """
+    group_id = get_group_id("Delivery Crew")
+    crew_ids = list(
+        User.groups.through.objects.filter(group_id=group_id).values_list(
+            "user_id", flat=True
+        )
+    )
+    if not crew_ids:
+        return 0
+    DeliveryCrewLoad.objects.bulk_create(
+        [DeliveryCrewLoad(user_id=crew_id) for crew_id in crew_ids],
+        ignore_conflicts=True,
+    )
+
+    assigned = 0
+    while limit is None or assigned < limit:
+        size = batch_size if limit is None else min(batch_size, limit - assigned)
+        with transaction.atomic():
+            orders = dict(
+                Order.objects.select_for_update()
+                .filter(delivery_crew__isnull=True, status=False)
+                .order_by("id")
+                .values_list("id", "user_id")[:size]
+            )
+            if not orders:
+                break
+            loads = list(
+                DeliveryCrewLoad.objects.filter(
+                    Exists(
+                        User.groups.through.objects.filter(
+                            user_id=OuterRef("user_id"), group_id=group_id
+                        )
+                    )
+                )
+                .order_by("open_orders", "user")
+                .values_list("open_orders", "user_id")[: len(orders)]
+            )
+            heapq.heapify(loads)
+            routed = defaultdict(list)
+            events = []
+            for order_id, user_id in orders.items():
+                load, crew_id = heapq.heappop(loads)
+                routed[crew_id].append(order_id)
+                heapq.heappush(loads, (load + 1, crew_id))
+                events.extend(
+                    order_events(order_id, user_id, (None, False), (crew_id, False))
+                )
+
+            updated = Order.objects.filter(
+                id__in=orders, delivery_crew__isnull=True, status=False
+            ).update(
+                delivery_crew_id=Case(
+                    *(
+                        When(id__in=batch, then=Value(crew_id))
+                        for crew_id, batch in routed.items()
+                    )
+                ),
+                version=F("version") + 1,
+            )
+            if updated != len(orders):
+                # Some orders were assigned or closed since the batch was read
+                # (select_for_update does not lock on every backend). Undo the
+                # batch and route it again from fresh rows, so the counters
+                # only ever count orders this UPDATE actually assigned.
+                transaction.set_rollback(True)
+                continue
+            adjust_crew_loads(
+                Counter({crew_id: len(batch) for crew_id, batch in routed.items()})
+            )
+            refresh_order_documents(orders)
+            publish_events(events)
+        assigned += len(orders)
+    return assigned
+
+
+def rebuild_crew_loads() -> None:
+    counts = dict(
+        Order.objects.filter(delivery_crew__isnull=False, status=False)
+        .values_list("delivery_crew")
+        .annotate(open_orders=Count("id"))
+    )
+    with transaction.atomic():
+        DeliveryCrewLoad.objects.exclude(user_id__in=counts).update(open_orders=0)
+        DeliveryCrewLoad.objects.bulk_create(
+            [
+                DeliveryCrewLoad(user_id=crew_id, open_orders=count)
+                for crew_id, count in counts.items()
+            ],
+            update_conflicts=True,
+            update_fields=["open_orders"],
+            unique_fields=["user"],
+        )
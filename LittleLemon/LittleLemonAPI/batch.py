@@ -0,0 +1,92 @@
+import io
+import json
+
+from asgiref.sync import iscoroutinefunction
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework.utils.encoders import JSONEncoder
+
+from .load_shedding import limited
+
+
+def build_subrequest(request, spec: dict) -> WSGIRequest:
+    """Build an in-process request for one entry of a batch.
+
+    The sub-request is authenticated as the batch's user rather than by
+    its own credentials.
+    """
+    path, _, query = spec["path"].partition("?")
+    body = b""
+    if "body" in spec:
+        body = json.dumps(spec["body"], cls=JSONEncoder).encode()
+    environ = {
+        name: value
+        for name, value in request.META.items()
+        if isinstance(value, str)
+        and (not name.startswith("HTTP_") or name == "HTTP_HOST")
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": spec["method"],
+            "PATH_INFO": path,
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": query,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.url_scheme": request.scheme,
+        }
+    )
+    for name, value in spec.get("headers", {}).items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    subrequest = WSGIRequest(environ)
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def run_subrequest(request, spec: dict) -> dict:
+    """Run one batch entry by calling its view directly.
+
+    Sub-requests skip the middleware stack. Only the concurrency limit is
+    applied, to each entry on its own, so a batch of reads counts as that
+    many reads and a checkout in a batch stays protected. Security, session,
+    CSRF, authentication, message and clickjacking middleware, profiling and
+    slow query attribution apply to the batch request as a whole.
+    """
+    subrequest = build_subrequest(request, spec)
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404:
+        return {"status": 404, "headers": {}, "body": {"detail": "Not found."}}
+    if iscoroutinefunction(match.func):
+        return {
+            "status": 400,
+            "headers": {},
+            "body": {"detail": "Streaming endpoints cannot be batched."},
+        }
+    subrequest.resolver_match = match
+    response = limited(
+        subrequest,
+        lambda subrequest: match.func(subrequest, *match.args, **match.kwargs),
+    )
+    if hasattr(response, "data"):
+        body = response.data
+    elif response.get("Content-Type", "").startswith("application/json"):
+        body = json.loads(response.content or b"null")
+    else:
+        body = response.content.decode(response.charset, errors="replace")
+    headers = {
+        name: value
+        for name, value in response.items()
+        if name.lower() not in ("content-type", "content-length", "vary", "allow")
+    }
+    return {"status": response.status_code, "headers": headers, "body": body}
+
+
+def run_subrequest_in_thread(request, spec: dict) -> dict:
+    try:
+        return run_subrequest(request, spec)
+    finally:
+        connections.close_all()
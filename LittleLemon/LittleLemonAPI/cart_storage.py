@@ -0,0 +1,220 @@
+import datetime
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+from .models import Cart, MenuItem
+
+
+def already_in_cart():
+    return ValidationError({"menuitem_id": "This item is already in the cart."})
+
+
+class DatabaseCartStorage:
+    """Every cart edit is a write to the ``Cart`` table."""
+
+    def items(self, user) -> list[Cart]:
+        return list(
+            Cart.objects.filter(user=user)
+            .select_related("menuitem__category")
+            .order_by("id")
+        )
+
+    def add(self, user, menuitem, quantity: int) -> Cart:
+        try:
+            with transaction.atomic():
+                return Cart.objects.create(
+                    user=user, menuitem=menuitem, quantity=quantity
+                )
+        except IntegrityError:
+            raise already_in_cart()
+
+    def remove(self, user, menuitem_id: int) -> None:
+        Cart.objects.filter(user=user, menuitem_id=menuitem_id).delete()
+
+    def flush(self, user, evict: bool = False) -> None:
+        pass
+
+    def flush_all(self) -> int:
+        return 0
+
+
+class CacheCartStorage:
+    """Keep carts in the cache and write them to ``Cart`` rows behind.
+
+    The cached cart is authoritative until it is flushed at checkout, which
+    also evicts it, or by ``manage.py flush_carts``. The first edit after a
+    flush appends the user to a change log (an atomic counter plus one key
+    per entry) that the periodic flush replays. The cache must be shared by
+    all processes and large enough not to evict carts; a lost change log
+    entry only delays persisting that cart until checkout.
+    """
+
+    prefix = "littlelemon:cart"
+    log = "littlelemon:cart-log"
+    fence_timeout = 60
+
+    def _key(self, user_id) -> str:
+        return f"{self.prefix}:{user_id}"
+
+    def _load(self, user) -> list[dict]:
+        lines = cache.get(self._key(user.pk))
+        if lines is None:
+            lines = [
+                {
+                    "menuitem_id": cart.menuitem_id,
+                    "quantity": cart.quantity,
+                    "unit_price": str(cart.unit_price),
+                    "price": str(cart.price),
+                }
+                for cart in Cart.objects.filter(user=user).order_by("id")
+            ]
+        return lines
+
+    def _save(self, user, lines: list[dict]) -> None:
+        timeout = settings.CART_CACHE_TIMEOUT
+        cache.set(self._key(user.pk), lines, timeout)
+        # Log each cart once until the next flush picks it up.
+        if cache.add(f"{self._key(user.pk)}-dirty", 1, timeout):
+            cache.add(self.log, 0, None)
+            cache.set(f"{self.log}:{cache.incr(self.log)}", user.pk, timeout)
+
+    def _cart(self, user, line: dict, menuitem=None) -> Cart:
+        cart = Cart(
+            user=user,
+            menuitem_id=line["menuitem_id"],
+            quantity=line["quantity"],
+            unit_price=Decimal(line["unit_price"]),
+            price=Decimal(line["price"]),
+        )
+        if menuitem is not None:
+            cart.menuitem = menuitem
+        return cart
+
+    def items(self, user) -> list[Cart]:
+        lines = self._load(user)
+        menuitems = MenuItem.objects.select_related("category").in_bulk(
+            [line["menuitem_id"] for line in lines]
+        )
+        return [
+            self._cart(user, line, menuitems.get(line["menuitem_id"])) for line in lines
+        ]
+
+    def add(self, user, menuitem, quantity: int) -> Cart:
+        lines = self._load(user)
+        if any(line["menuitem_id"] == menuitem.pk for line in lines):
+            raise already_in_cart()
+        line = {
+            "menuitem_id": menuitem.pk,
+            "quantity": quantity,
+            "unit_price": str(menuitem.price),
+            "price": str(quantity * menuitem.price),
+        }
+        self._save(user, lines + [line])
+        return self._cart(user, line, menuitem)
+
+    def remove(self, user, menuitem_id: int) -> None:
+        lines = self._load(user)
+        self._save(user, [line for line in lines if line["menuitem_id"] != menuitem_id])
+
+    @transaction.atomic
+    def _write(self, user_id, fenced: bool = True) -> None:
+        # Read the cart inside the transaction, which holds the write lock, so
+        # a flush racing a checkout runs wholly before or after it. After it,
+        # the cart is still cached until the eviction runs on commit; the
+        # fence set by the checkout keeps it from being written back.
+        if fenced and cache.get(f"{self._key(user_id)}-ordered"):
+            return
+        lines = cache.get(self._key(user_id))
+        if lines is None:
+            return
+        Cart.objects.filter(user_id=user_id).delete()
+        Cart.objects.bulk_create(
+            Cart(
+                user_id=user_id,
+                menuitem_id=line["menuitem_id"],
+                quantity=line["quantity"],
+                unit_price=Decimal(line["unit_price"]),
+                price=Decimal(line["price"]),
+            )
+            for line in lines
+        )
+
+    def flush(self, user, evict: bool = False) -> None:
+        """Write the cached cart to ``Cart`` rows.
+
+        Checkout evicts the cached copy once it commits, making the rows
+        authoritative again. Until then a fence, set inside the checkout's
+        transaction, stops ``flush_all`` from writing the ordered cart back.
+        If the checkout rolls back, the fence expires after
+        ``fence_timeout`` seconds; until then the cart is only persisted by
+        the next checkout.
+        """
+        key = self._key(user.pk)
+        if evict:
+            cache.set(f"{key}-ordered", 1, self.fence_timeout)
+            transaction.on_commit(partial(cache.delete_many, [key, f"{key}-ordered"]))
+        self._write(user.pk, fenced=not evict)
+
+    def flush_all(self, chunk_size: int = 1000) -> int:
+        """Write every cart changed since the last run; return how many."""
+        start = cache.get(f"{self.log}-flushed", 0)
+        end = cache.get(self.log, 0)
+        chunks = [
+            [f"{self.log}:{n}" for n in range(first, min(first + chunk_size, end + 1))]
+            for first in range(start + 1, end + 1, chunk_size)
+        ]
+        user_ids = set()
+        for keys in chunks:
+            user_ids.update(cache.get_many(keys).values())
+        for user_id in user_ids:
+            # Clear the mark before reading the cart, so an edit made after
+            # the read logs the cart again.
+            cache.delete(f"{self._key(user_id)}-dirty")
+            self._write(user_id)
+        cache.set(f"{self.log}-flushed", end, None)
+        for keys in chunks:
+            cache.delete_many(keys)
+        return len(user_ids)
+
+
+def expire_carts(batch_size: int = 500) -> int:
+    """Delete carts nobody touched within ``CART_TTL``; return the rows deleted.
+
+    Each batch is a short transaction of its own, so checkouts waiting for
+    the write lock are never held up by more than one batch.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.CART_TTL)
+    expired = 0
+    kept = set()
+    while True:
+        # Candidates have at least one stale line, found through the index
+        # on ``updated``.
+        user_ids = set(
+            Cart.objects.filter(updated__lte=cutoff)
+            .exclude(user__in=kept)
+            .values_list("user", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not user_ids:
+            return expired
+        with transaction.atomic():
+            # Re-check per user, so a cart with an item added since the
+            # lookup is kept whole rather than losing its older items.
+            touched = set(
+                Cart.objects.filter(user__in=user_ids, updated__gt=cutoff).values_list(
+                    "user", flat=True
+                )
+            )
+            expired += Cart.objects.filter(user__in=user_ids - touched).delete()[0]
+        kept |= touched
+
+
+def get_cart_storage():
+    return import_string(settings.CART_STORAGE)()
@@ -0,0 +1,89 @@
+import threading
+
+from django.conf import settings
+from rest_framework.response import Response
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run a function once for all concurrent callers with the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key, func, timeout: float | None = None):
+        with self._lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                flight.followers += 1
+
+        if not leader:
+            # Compute it ourselves if the leader takes too long.
+            if not flight.done.wait(timeout):
+                return func()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result
+
+
+single_flight = SingleFlight()
+
+
+class CoalescedGetMixin:
+    """Share one response between concurrent identical GETs in this process.
+
+    Requests are identical when they hit the same view with the same host,
+    path and query string, and have the same ``coalesce_scope``. Views whose
+    response depends on the user must include that in the scope.
+    Authentication, permissions and throttling still run for every request.
+    A request that joins a computation already under way may see data as of
+    when that computation started.
+    """
+
+    def coalesce_scope(self, request):
+        return ""
+
+    def get(self, request, *args, **kwargs):
+        key = (
+            type(self).__qualname__,
+            request.get_host(),
+            request.get_full_path(),
+            self.coalesce_scope(request),
+        )
+        shared = single_flight.do(
+            key,
+            lambda: super(CoalescedGetMixin, self).get(request, *args, **kwargs),
+            settings.COALESCE_TIMEOUT,
+        )
+        # Each request renders its own response from the shared data.
+        return Response(
+            shared.data,
+            status=shared.status_code,
+            headers={
+                name: value
+                for name, value in shared.items()
+                if name.lower() != "content-type"
+            },
+        )
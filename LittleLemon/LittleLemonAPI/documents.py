@@ -0,0 +1,74 @@
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Order, OrderDocument
+from .serializers import OrderSerializer
+
+DOCUMENT_FIELDS = ["user", "delivery_crew", "status", "total", "date", "document"]
+
+
+def document_orders():
+    return Order.objects.select_related("user").prefetch_related("orderitem_set")
+
+
+def build_documents(orders) -> list[OrderDocument]:
+    return [
+        OrderDocument(
+            order_id=order.id,
+            user_id=order.user_id,
+            delivery_crew_id=order.delivery_crew_id,
+            status=order.status,
+            total=order.total,
+            date=order.date,
+            document=OrderSerializer(order).data,
+        )
+        for order in orders
+    ]
+
+
+def refresh_order_documents(order_ids) -> None:
+    """Rewrite the read-model documents of ``order_ids`` with one upsert.
+
+    Call it in the same transaction as the change to the normalized tables so
+    the listing never serves a committed order without its document.
+    """
+    documents = build_documents(document_orders().filter(id__in=order_ids))
+    OrderDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        update_fields=DOCUMENT_FIELDS,
+        unique_fields=["order"],
+    )
+
+
+def _document_state(document: OrderDocument) -> tuple:
+    return (
+        document.user_id,
+        document.delivery_crew_id,
+        bool(document.status),
+        document.total,
+        document.date,
+        json.loads(json.dumps(document.document, cls=JSONEncoder)),
+    )
+
+
+def stale_order_documents(batch_size: int = 500):
+    """Yield batches of order ids whose document is missing or out of date."""
+    last_id = 0
+    while True:
+        orders = list(
+            document_orders().filter(id__gt=last_id).order_by("id")[:batch_size]
+        )
+        if not orders:
+            return
+        last_id = orders[-1].id
+        stored = OrderDocument.objects.in_bulk([order.id for order in orders])
+        stale = [
+            expected.order_id
+            for expected in build_documents(orders)
+            if expected.order_id not in stored
+            or _document_state(stored[expected.order_id]) != _document_state(expected)
+        ]
+        if stale:
+            yield stale
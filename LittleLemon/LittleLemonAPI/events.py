@@ -0,0 +1,101 @@
+import asyncio
+import itertools
+import threading
+
+from django.db import transaction
+
+from .outbox import write_outbox
+
+
+class Subscription:
+    def __init__(self, accepts, maxsize=100):
+        self.accepts = accepts
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event):
+        # Runs on the subscriber's event loop. A consumer that stopped reading
+        # loses its oldest events instead of growing without bound.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class OrderEventBroker:
+    """In-process fan-out of order events to streaming clients.
+
+    Publishers may run on any thread; each event is handed to the subscriber's
+    event loop, so an idle connection costs a queue and nothing else. Events
+    only reach clients connected to the same process.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, accepts) -> Subscription:
+        subscription = Subscription(accepts)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event: dict) -> None:
+        event = {"id": next(self._ids), **event}
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.accepts(event):
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.put, event)
+                except RuntimeError:
+                    # The subscriber's loop has shut down.
+                    self.unsubscribe(subscription)
+
+
+broker = OrderEventBroker()
+
+
+def order_events(order_id, user_id, before, after) -> list[dict]:
+    """Return the events for an order moving from ``before`` to ``after``.
+
+    Both states are ``(delivery_crew_id, status)`` pairs; ``before`` is
+    ``None`` for a new order.
+    """
+    crew_id, status = after
+    event = {
+        "order": order_id,
+        "user": user_id,
+        "delivery_crew": crew_id,
+        "status": bool(status),
+    }
+    if before is None:
+        return [{"type": "order.created", **event}]
+    events = []
+    if before[0] != crew_id:
+        events.append(
+            {"type": "order.assigned", **event, "previous_delivery_crew": before[0]}
+        )
+    if bool(before[1]) != bool(status):
+        events.append({"type": "order.status", **event})
+    return events
+
+
+def publish_events(events: list[dict]) -> None:
+    """Stream ``events`` once the transaction commits and queue their webhooks.
+
+    The outbox rows are written in the caller's transaction, so webhooks see
+    exactly the committed changes.
+    """
+    write_outbox(events)
+
+    def publish():
+        for event in events:
+            broker.publish(event)
+
+    if events:
+        transaction.on_commit(publish)
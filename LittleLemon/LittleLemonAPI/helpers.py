@@ -1,4 +1,11 @@
-from django.contrib.auth.models import User
+import time
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.utils.text import slugify
+
+CATALOG_VERSION_KEY = "littlelemon:catalog-version"
+GROUP_ID_KEY = "littlelemon:group-id:{}"
 
 
 def is_customer(user: User) -> bool:
@@ -15,3 +22,30 @@ def is_manager(user: User) -> bool:
 
 def is_delivery_crew(user: User) -> bool:
     return user.groups.filter(name="Delivery Crew").exists()
+
+
+def get_catalog_version() -> int:
+    # Seeding from the clock keeps versions unique when the key is evicted
+    # or the cache is restarted, so stale ETags can never match again.
+    cache.add(CATALOG_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+    return cache.get(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version() -> int:
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        return get_catalog_version()
+
+
+def get_group_id(name: str) -> int:
+    key = GROUP_ID_KEY.format(slugify(name))
+    group_id = cache.get(key)
+    if group_id is None:
+        group_id = Group.objects.values_list("id", flat=True).get(name=name)
+        cache.set(key, group_id, timeout=None)
+    return group_id
+
+
+def forget_group_id(name: str) -> None:
+    cache.delete(GROUP_ID_KEY.format(slugify(name)))
@@ -0,0 +1,125 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+
+
+def request_fingerprint(request) -> str:
+    payload = json.dumps(
+        [request.method, request.path, request.data], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def claim_key(user, key: str, fingerprint: str):
+    """Insert an in-progress record for ``key``, or return the existing one.
+
+    Returns ``(record, claimed)``. The unique ``(user, key)`` constraint makes
+    exactly one of several concurrent requests the owner of the key.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=fingerprint,
+                expires=now + datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+        return record, True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            return claim_key(user, key, fingerprint)
+
+    # Expired keys, and in-progress keys whose request died, may be reclaimed.
+    # The conditional delete lets only one of several retries do so.
+    lock_timeout = now - datetime.timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    if record.expires <= now or (
+        record.status_code is None and record.created <= lock_timeout
+    ):
+        stale = Q(expires__lte=now) | Q(
+            status_code__isnull=True, created__lte=lock_timeout
+        )
+        if IdempotencyKey.objects.filter(stale, pk=record.pk).delete()[0]:
+            return claim_key(user, key, fingerprint)
+    return record, False
+
+
+def idempotent(handler):
+    """Replay the first response for a repeated ``Idempotency-Key`` header.
+
+    The key is claimed before ``handler`` runs and its own transaction starts,
+    so a retry never re-executes the handler. Responses with a 5xx status or
+    an exception release the key so the client can retry.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None or not request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+        if not key or len(key) > 255:
+            return Response(
+                {"detail": f"{HEADER} must be 1-255 characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if not claimed:
+            if record.request_hash != fingerprint:
+                return Response(
+                    {"detail": f"{HEADER} was already used for a different request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record.status_code is None:
+                return Response(
+                    {"detail": "A request with this key is still in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={"Retry-After": "1"},
+                )
+            return Response(
+                record.response_body,
+                status=record.status_code,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response_body = getattr(response, "data", None)
+            record.save(update_fields=["status_code", "response_body"])
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size: int = 1000) -> int:
+    purged = 0
+    while True:
+        batch = list(
+            IdempotencyKey.objects.filter(expires__lte=timezone.now()).values_list(
+                "pk", flat=True
+            )[:batch_size]
+        )
+        if not batch:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,181 @@
+import datetime
+import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def job(name: str | None = None, max_attempts: int | None = None):
+    """Register a function as a background job.
+
+    The function gains an ``enqueue(**kwargs)`` method. Its keyword arguments
+    are stored as JSON, so pass ids and plain values rather than model
+    instances.
+    """
+
+    def register(func):
+        job_name = name or f"{func.__module__}.{func.__qualname__}"
+        registry[job_name] = func
+        func.job_name = job_name
+        func.enqueue = lambda **kwargs: enqueue(
+            job_name, kwargs, max_attempts=max_attempts
+        )
+        return func
+
+    return register
+
+
+def enqueue(name: str, payload: dict, max_attempts: int | None = None) -> Job:
+    """Queue ``name`` to run with ``payload`` once the current transaction commits.
+
+    The row is written inside the caller's transaction, so a rolled back
+    request never leaves a job behind and a committed one never loses it.
+    """
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=timezone.now(),
+    )
+
+
+def retry_delay(attempts: int) -> datetime.timedelta:
+    return datetime.timedelta(
+        seconds=min(
+            settings.JOB_RETRY_DELAY * 2 ** (attempts - 1),
+            settings.JOB_RETRY_MAX_DELAY,
+        )
+    )
+
+
+def claim_jobs(limit: int) -> list[int]:
+    now = timezone.now()
+    due = Q(state=Job.QUEUED, run_after__lte=now) | Q(
+        state=Job.RUNNING, locked_until__lte=now
+    )
+    with transaction.atomic():
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("run_after", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        Job.objects.filter(id__in=job_ids).update(
+            state=Job.RUNNING,
+            attempts=F("attempts") + 1,
+            locked_until=now + datetime.timedelta(seconds=settings.JOB_LEASE),
+        )
+    return job_ids
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def execute_job(job_id: int) -> bool:
+    """Run a claimed job; return whether it succeeded.
+
+    The job's work and the deletion of its row commit together, so a job
+    whose database work committed is never run again. Every claim bumps
+    ``attempts``, so it doubles as the lease token: if the lease expired and
+    another worker claimed the job meanwhile, the delete matches no row and
+    this run's work is rolled back.
+    """
+    job = Job.objects.filter(pk=job_id, state=Job.RUNNING).first()
+    if job is None:
+        return False
+    leased = Job.objects.filter(pk=job.pk, attempts=job.attempts)
+    try:
+        if job.name not in registry:
+            autodiscover_modules("jobs")
+        func = registry[job.name]
+        with transaction.atomic():
+            func(**job.payload)
+            if not leased.delete()[0]:
+                raise LeaseLost
+        return True
+    except LeaseLost:
+        logger.warning("Job %s (%s) outlived its lease", job.pk, job.name)
+        return False
+    except Exception:
+        logger.exception("Job %s (%s) failed", job.pk, job.name)
+        error = traceback.format_exc()
+    if job.attempts >= job.max_attempts:
+        leased.update(state=Job.FAILED, locked_until=None, last_error=error)
+    else:
+        leased.update(
+            state=Job.QUEUED,
+            locked_until=None,
+            run_after=timezone.now() + retry_delay(job.attempts),
+            last_error=error,
+        )
+    return False
+
+
+def _execute_in_worker(job_id: int) -> bool:
+    close_old_connections()
+    try:
+        return execute_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_pending_jobs(batch_size: int = 100) -> int:
+    """Run every job that is due in the calling thread; return how many ran."""
+    ran = 0
+    while job_ids := claim_jobs(batch_size):
+        for job_id in job_ids:
+            execute_job(job_id)
+        ran += len(job_ids)
+    return ran
+
+
+def run_worker(
+    workers: int = 4,
+    pool: str = "thread",
+    batch_size: int | None = None,
+    poll_interval: float = 1.0,
+    once: bool = False,
+) -> int:
+    """Claim due jobs in batches and run them on a thread or process pool.
+
+    With ``once`` the worker exits when no job is due; otherwise it polls
+    every ``poll_interval`` seconds.
+    """
+    batch_size = batch_size or workers * 2
+    if pool == "process":
+        # Spawn rather than fork, so no child inherits this process's
+        # database connections. Children load the job registry on demand.
+        executor = ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+    else:
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="job")
+
+    ran = 0
+    with executor:
+        while True:
+            job_ids = claim_jobs(batch_size)
+            if job_ids:
+                list(executor.map(_execute_in_worker, job_ids))
+                ran += len(job_ids)
+            elif once:
+                return ran
+            else:
+                time.sleep(poll_interval)
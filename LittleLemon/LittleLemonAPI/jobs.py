@@ -0,0 +1,39 @@
+import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from .analytics import record_order_sales
+from .assignment import assign_open_orders
+from .job_queue import job
+
+
+@job(name="analytics.record_order_sales")
+def record_sales(date: str, total: str, lines: list, sign: int = 1):
+    order = SimpleNamespace(
+        date=datetime.date.fromisoformat(date), total=Decimal(total)
+    )
+    record_order_sales(
+        order,
+        [
+            (menuitem_id, quantity, Decimal(revenue))
+            for menuitem_id, quantity, revenue in lines
+        ],
+        sign=sign,
+    )
+
+
+def enqueue_order_sales(order, lines, sign: int = 1) -> None:
+    record_sales.enqueue(
+        date=order.date.isoformat(),
+        total=str(order.total),
+        lines=[
+            [menuitem_id, quantity, str(revenue)]
+            for menuitem_id, quantity, revenue in lines
+        ],
+        sign=sign,
+    )
+
+
+@job(name="assignment.assign_open_orders")
+def assign_orders():
+    assign_open_orders()
@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+
+# Checkouts and order status updates are never shed.
+PROTECTED_ROUTES = [
+    ("POST", re.compile(r"^/api/orders/?$")),
+    ("PUT", re.compile(r"^/api/orders/\d+$")),
+    ("PATCH", re.compile(r"^/api/orders/\d+$")),
+    ("PATCH", re.compile(r"^/api/orders/bulk$")),
+]
+# Batches are admitted entry by entry instead, by the batch view.
+BATCH_ROUTE = ("POST", re.compile(r"^/api/batch/?$"))
+ID_SEGMENT = re.compile(r"/\d+")
+
+
+def is_protected(request) -> bool:
+    return any(
+        request.method == method and pattern.match(request.path)
+        for method, pattern in PROTECTED_ROUTES
+    )
+
+
+class ConcurrencyLimit:
+    """An additive-increase, multiplicative-decrease concurrency limit.
+
+    The limit grows by about one per round of requests while latency stays
+    within CONCURRENCY_LATENCY_TOLERANCE times the baseline, the lowest
+    latency seen lately for the same route, and shrinks by
+    CONCURRENCY_BACKOFF when it does not. Queueing shows up as latency
+    before it shows up as errors, so the limit settles near the concurrency
+    the routes can serve without queueing.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limit = float(settings.CONCURRENCY_LIMIT_INITIAL)
+        self.in_flight = 0
+        self.baselines = {}
+
+    def acquire(self, reserve: float = 0.0, force: bool = False) -> bool:
+        """Admit a request unless the limit, less a ``reserve`` share, is used."""
+        with self.lock:
+            if not force and self.in_flight >= int(self.limit * (1 - reserve)):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, route: str, latency: float) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            baseline = self.baselines.get(route)
+            if baseline is None or latency < baseline:
+                baseline = latency
+            else:
+                # Drift up slowly, so a lasting change in the work a route
+                # does is not mistaken for queueing forever.
+                baseline += (latency - baseline) * 0.01
+            self.baselines[route] = baseline
+            if latency <= baseline * settings.CONCURRENCY_LATENCY_TOLERANCE:
+                self.limit += 1 / self.limit
+            else:
+                self.limit *= settings.CONCURRENCY_BACKOFF
+            self.limit = min(
+                max(self.limit, settings.CONCURRENCY_LIMIT_MIN),
+                settings.CONCURRENCY_LIMIT_MAX,
+            )
+
+
+_limit = None
+_limit_lock = threading.Lock()
+
+
+def get_limit() -> ConcurrencyLimit:
+    global _limit
+    with _limit_lock:
+        if _limit is None:
+            _limit = ConcurrencyLimit()
+        return _limit
+
+
+def reset_limit() -> None:
+    global _limit
+    with _limit_lock:
+        _limit = None
+
+
+def limited(request, get_response):
+    """Run ``get_response(request)`` if the concurrency limit admits it.
+
+    Protected routes are always admitted; other requests only while
+    CONCURRENCY_RESERVE of the limit is left for them, and beyond that get an
+    immediate 503 with ``Retry-After`` instead of waiting for a worker thread.
+    """
+    limit = get_limit()
+    if not limit.acquire(settings.CONCURRENCY_RESERVE, force=is_protected(request)):
+        return JsonResponse(
+            {"detail": "The server is busy. Retry later."},
+            status=503,
+            headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER)},
+        )
+    started = time.perf_counter()
+    try:
+        return get_response(request)
+    finally:
+        route = f"{request.method} {ID_SEGMENT.sub('/<id>', request.path)}"
+        limit.release(route, time.perf_counter() - started)
+
+
+class ConcurrencyLimitMiddleware:
+    """Shed requests beyond the process's adaptive concurrency limit.
+
+    All routes share one limit, so checkouts queueing on the write lock show
+    up in the latency and in-flight count that cheap reads are admitted
+    against. See ``limited`` for who is admitted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        method, pattern = BATCH_ROUTE
+        if request.method == method and pattern.match(request.path):
+            return self.get_response(request)
+        return limited(request, self.get_response)
@@ -0,0 +1,23 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = "Move delivered orders older than the given age into the archive tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days", type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        cutoff = datetime.date.today() - datetime.timedelta(
+            days=options["older_than_days"]
+        )
+        archived = archive_orders(cutoff, batch_size=options["batch_size"])
+        self.stdout.write(f"Archived {archived} orders dated before {cutoff}.")
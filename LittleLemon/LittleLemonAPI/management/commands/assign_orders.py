@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.assignment import assign_open_orders, rebuild_crew_loads
+
+
+class Command(BaseCommand):
+    help = "Assign unassigned open orders to the least loaded delivery crew."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument(
+            "--rebuild-loads",
+            action="store_true",
+            help="Recompute the per-crew open-order counters before assigning.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild_loads"]:
+            rebuild_crew_loads()
+        assigned = assign_open_orders(
+            batch_size=options["batch_size"], limit=options["limit"]
+        )
+        self.stdout.write(f"Assigned {assigned} orders.")
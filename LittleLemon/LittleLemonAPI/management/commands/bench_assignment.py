@@ -0,0 +1,58 @@
+import datetime
+import time
+
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from LittleLemonAPI.assignment import assign_open_orders
+from LittleLemonAPI.models import DeliveryCrewLoad, Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate automatic delivery-crew assignment on synthetic data. "
+        "All data is created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--crew", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.simulate(options["orders"], options["crew"], options["batch_size"])
+            transaction.set_rollback(True)
+
+    def simulate(self, order_count, crew_count, batch_size):
+        group, _ = Group.objects.get_or_create(name="Delivery Crew")
+        customer = User.objects.create(username="bench-customer")
+        crew = User.objects.bulk_create(
+            User(username=f"bench-crew-{i}") for i in range(crew_count)
+        )
+        group.user_set.add(*crew)
+        today = datetime.date.today()
+        Order.objects.bulk_create(
+            (
+                Order(user=customer, status=False, total=10, date=today)
+                for _ in range(order_count)
+            ),
+            batch_size=1000,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            assigned = assign_open_orders(batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+
+        loads = DeliveryCrewLoad.objects.filter(user__in=crew).values_list(
+            "open_orders", flat=True
+        )
+        self.stdout.write(
+            f"orders={order_count} crew={crew_count} batch_size={batch_size}\n"
+            f"assigned={assigned} in {elapsed * 1000:.1f} ms "
+            f"({assigned / elapsed:.0f} orders/s, {len(queries)} queries)\n"
+            f"load min={min(loads)} max={max(loads)}"
+        )
@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from LittleLemonAPI.cart_storage import CacheCartStorage, DatabaseCartStorage
+from LittleLemonAPI.models import Cart, Category, MenuItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cart edit throughput and database writes of the database and "
+        "cache cart storages. Run it against a scratch database; the synthetic "
+        "data is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=50)
+        parser.add_argument("--items", type=int, default=10)
+
+    def handle(self, *args, **options):
+        category = Category.objects.create(slug="bench-cart", title="Bench")
+        items = MenuItem.objects.bulk_create(
+            MenuItem(
+                title=f"bench-cart-{i}", price=10, featured=False, category=category
+            )
+            for i in range(options["items"])
+        )
+        customers = User.objects.bulk_create(
+            User(username=f"bench-cart-{i}") for i in range(options["customers"])
+        )
+        try:
+            for storage in (DatabaseCartStorage(), CacheCartStorage()):
+                self.run(storage, customers, items)
+        finally:
+            for user in customers:
+                cache.delete(CacheCartStorage()._key(user.pk))
+            User.objects.filter(pk__in=[user.pk for user in customers]).delete()
+            MenuItem.objects.filter(category=category).delete()
+            category.delete()
+
+    def run(self, storage, customers, items):
+        # Every customer fills a cart, empties half of it, then flushes.
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for user in customers:
+                for item in items:
+                    storage.add(user, item, 1)
+                for item in items[::2]:
+                    storage.remove(user, item.pk)
+            edited = time.perf_counter() - started
+            storage.flush_all()
+            elapsed = time.perf_counter() - started
+        edits = len(customers) * (len(items) + len(items[::2]))
+        writes = sum(
+            query["sql"].lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
+            for query in queries.captured_queries
+        )
+        rows = Cart.objects.filter(user__in=customers).count()
+        self.stdout.write(
+            f"{type(storage).__name__}: {edits} edits in {edited * 1000:.1f} ms "
+            f"({edits / edited:.0f}/s), {elapsed * 1000:.1f} ms with flush, "
+            f"{len(queries)} queries, {writes} writes, "
+            f"{rows} cart rows"
+        )
+        if rows != len(customers) * (len(items) - len(items[::2])):
+            self.stderr.write("Carts were lost; the cache is evicting entries.")
+        Cart.objects.filter(user__in=customers).delete()
@@ -0,0 +1,97 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from LittleLemonAPI.analytics import order_lines
+from LittleLemonAPI.assignment import adjust_crew_loads, crew_load_delta
+from LittleLemonAPI.jobs import enqueue_order_sales
+from LittleLemonAPI.models import Cart, Category, MenuItem, Order
+from LittleLemonAPI.views import OrderList
+
+
+class Command(BaseCommand):
+    help = (
+        "Race concurrent checkouts for one stock-tracked menu item and report "
+        "throughput and overselling. Run it against a scratch database: the "
+        "checkouts commit, and the synthetic data is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=200)
+        parser.add_argument("--stock", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=16)
+
+    def handle(self, *args, **options):
+        category = Category.objects.create(slug="bench-checkout", title="Bench")
+        item = MenuItem.objects.create(
+            title="bench-checkout",
+            price=10,
+            featured=False,
+            category=category,
+            stock=options["stock"],
+        )
+        customers = User.objects.bulk_create(
+            User(username=f"bench-checkout-{i}") for i in range(options["customers"])
+        )
+        try:
+            Cart.objects.bulk_create(
+                Cart(user=user, menuitem=item, quantity=1, unit_price=10, price=10)
+                for user in customers
+            )
+            self.race(item, customers, options["workers"])
+        finally:
+            self.clean_up(item, customers)
+
+    def race(self, item, customers, workers):
+        view = OrderList.as_view()
+        factory = APIRequestFactory()
+        stock = item.stock
+
+        def checkout(user):
+            request = factory.post("/api/orders/", {}, format="json")
+            force_authenticate(request, user)
+            started = time.perf_counter()
+            try:
+                response = view(request)
+            finally:
+                # Like a request cycle with CONN_MAX_AGE = 0.
+                connection.close()
+            return response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(checkout, customers))
+        elapsed = time.perf_counter() - started
+
+        codes = Counter(code for code, _ in results)
+        latencies = sorted(latency for _, latency in results)
+        item.refresh_from_db()
+        sold = Order.objects.filter(user__in=customers).count()
+        self.stdout.write(
+            f"customers={len(customers)} stock={stock} workers={workers} "
+            f"database={connection.vendor}\n"
+            f"{len(results)} checkouts in {elapsed * 1000:.1f} ms "
+            f"({len(results) / elapsed:.0f}/s), "
+            f"p50={latencies[len(latencies) // 2] * 1000:.1f} ms "
+            f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms\n"
+            f"responses={dict(codes)} orders={sold} stock left={item.stock}"
+        )
+        if sold > stock or sold != stock - item.stock:
+            self.stderr.write("Orders and remaining stock disagree.")
+
+    def clean_up(self, item, customers):
+        with transaction.atomic():
+            for order in Order.objects.filter(user__in=customers):
+                enqueue_order_sales(order, order_lines(order), sign=-1)
+                adjust_crew_loads(
+                    crew_load_delta((order.delivery_crew_id, order.status), None)
+                )
+            User.objects.filter(pk__in=[user.pk for user in customers]).delete()
+            category = item.category
+            item.delete()
+            category.delete()
@@ -0,0 +1,113 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter, so every run pays the full cold start.
+CHILD = """
+import asyncio, json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+entry, path = sys.argv[1:]
+started = time.perf_counter()
+if entry == "wsgi":
+    from LittleLemon.wsgi import application
+else:
+    from LittleLemon.asgi import application
+imported = time.perf_counter()
+
+if entry == "wsgi":
+    environ = {"PATH_INFO": path, "HTTP_HOST": "localhost"}
+    setup_testing_defaults(environ)
+    statuses = []
+    body = b"".join(
+        application(environ, lambda status, headers: statuses.append(status))
+    )
+    status = int(statuses[0].split()[0])
+else:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "server": ("localhost", 80), "client": ("127.0.0.1", 0),
+    }
+    messages = []
+
+    async def main():
+        done = asyncio.Event()
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body"
+            ):
+                done.set()
+
+        await application(scope, receive, send)
+
+    asyncio.run(main())
+    status = messages[0]["status"]
+finished = time.perf_counter()
+print(json.dumps({
+    "import": imported - started, "request": finished - imported, "status": status
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cold import time of wsgi.py and asgi.py and the latency "
+        "of the first request, for each settings profile, in fresh processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            default=["LittleLemon.settings", "LittleLemon.settings_api"],
+            help="Settings modules to compare.",
+        )
+        parser.add_argument("--path", default="/api/menu-items/")
+        parser.add_argument("--runs", type=int, default=5)
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"]:
+            for entry in ("wsgi", "asgi"):
+                runs = [
+                    self.run(profile, entry, options["path"])
+                    for _ in range(options["runs"])
+                ]
+                imports = [run["import"] * 1000 for run in runs]
+                requests = [run["request"] * 1000 for run in runs]
+                self.stdout.write(
+                    f"{profile} {entry}: import median={statistics.median(imports):.1f} ms "
+                    f"min={min(imports):.1f} ms, first request "
+                    f"median={statistics.median(requests):.1f} ms "
+                    f"min={min(requests):.1f} ms, "
+                    f"status={sorted({run['status'] for run in runs})}"
+                )
+
+    def run(self, profile, entry, path):
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, entry, path],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, "DJANGO_SETTINGS_MODULE": profile},
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        # Report the child's traceback rather than CalledProcessError.
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.splitlines()[-1])
@@ -0,0 +1,115 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from LittleLemonAPI.models import Category, MenuItem
+
+# Runs in a fresh interpreter, like a newly started worker.
+CHILD = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.wsgi import get_wsgi_application
+
+mode, token, count, paths = sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4:]
+application = get_wsgi_application()
+started = time.perf_counter()
+if mode == "warm":
+    from LittleLemonAPI.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+
+latencies, statuses = [], set()
+for i in range(count):
+    path, _, query = paths[i % len(paths)].partition("?")
+    environ = {
+        "PATH_INFO": path, "QUERY_STRING": query, "HTTP_HOST": "localhost",
+        "HTTP_AUTHORIZATION": "Token " + token,
+    }
+    setup_testing_defaults(environ)
+    sent = time.perf_counter()
+    b"".join(application(environ, lambda status, headers: statuses.add(status)))
+    latencies.append(time.perf_counter() - sent)
+print(json.dumps({
+    "warmup": warmed - started, "latencies": latencies, "statuses": sorted(statuses)
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency of a new worker's first requests with and "
+        "without warm-up, in fresh processes. Run it against a scratch "
+        "database; the synthetic data is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=60)
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--items", type=int, default=50)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username="bench-warmup")
+        token = Token.objects.create(user=user)
+        category = Category.objects.create(slug="bench-warmup", title="Bench")
+        MenuItem.objects.bulk_create(
+            MenuItem(
+                title=f"bench-warmup-{i}",
+                price=10,
+                featured=i % 5 == 0,
+                category=category,
+            )
+            for i in range(options["items"])
+        )
+        try:
+            for mode in ("cold", "warm"):
+                runs = [
+                    self.run(mode, token.key, options["requests"])
+                    for _ in range(options["runs"])
+                ]
+                self.report(mode, runs)
+        finally:
+            MenuItem.objects.filter(category=category).delete()
+            category.delete()
+            user.delete()
+
+    def run(self, mode, token, count):
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, mode, token, str(count)]
+            + settings.WARMUP_PATHS,
+            cwd=settings.BASE_DIR,
+            env=os.environ,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def report(self, mode, runs):
+        # Medians across runs of each request position, so one slow process
+        # does not decide the result.
+        medians = [
+            statistics.median(latencies)
+            for latencies in zip(*(run["latencies"] for run in runs))
+        ]
+        ordered = sorted(medians)
+        first = len(settings.WARMUP_PATHS)
+        statuses = sorted({status for run in runs for status in run["statuses"]})
+        self.stdout.write(
+            f"{mode}: warm-up "
+            f"{statistics.median(run['warmup'] for run in runs) * 1000:.1f} ms, "
+            f"first request {medians[0] * 1000:.1f} ms, "
+            f"first {first} requests {sum(medians[:first]) * 1000:.1f} ms, "
+            f"p50 {ordered[len(ordered) // 2] * 1000:.1f} ms, "
+            f"p99 {ordered[int(len(ordered) * 0.99)] * 1000:.1f} ms, "
+            f"max {ordered[-1] * 1000:.1f} ms, statuses {statuses}"
+        )
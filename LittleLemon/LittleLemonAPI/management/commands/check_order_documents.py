@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.documents import refresh_order_documents, stale_order_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the order read-model documents with the orders they were built "
+        "from, and optionally rewrite the ones that are missing or stale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--fix", action="store_true", help="Rewrite missing or stale documents."
+        )
+
+    def handle(self, *args, **options):
+        stale = 0
+        for order_ids in stale_order_documents(options["batch_size"]):
+            stale += len(order_ids)
+            if options["fix"]:
+                refresh_order_documents(order_ids)
+            elif options["verbosity"] > 1:
+                self.stdout.write(" ".join(str(order_id) for order_id in order_ids))
+
+        if options["fix"]:
+            self.stdout.write(f"Rewrote {stale} order documents.")
+        else:
+            self.stdout.write(f"Found {stale} missing or stale order documents.")
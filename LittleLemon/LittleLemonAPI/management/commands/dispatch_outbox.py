@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.outbox import WebhookClient, dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued order events to the ORDER_WEBHOOK_URLS in batches. "
+        "Run a single dispatcher."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once nothing is due."
+        )
+
+    def handle(self, *args, **options):
+        client = WebhookClient()
+        delivered = 0
+        try:
+            while True:
+                sent = dispatch_outbox(client, options["batch_size"])
+                delivered += sent
+                if sent:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        finally:
+            client.close()
+        self.stdout.write(f"Delivered {delivered} events.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.cart_storage import expire_carts
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned carts, older than CART_TTL, in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        expired = expire_carts(batch_size=options["batch_size"])
+        self.stdout.write(f"Deleted {expired} expired cart items.")
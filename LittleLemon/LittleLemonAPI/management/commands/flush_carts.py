@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.cart_storage import get_cart_storage
+
+
+class Command(BaseCommand):
+    help = "Write carts held by a write-behind cart storage to the database."
+
+    def handle(self, *args, **options):
+        flushed = get_cart_storage().flush_all()
+        self.stdout.write(f"Flushed {flushed} carts.")
@@ -0,0 +1,21 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.analytics import rebuild_popularity, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily sales rollups and menu item popularity from "
+        "orders, e.g. to backfill."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=datetime.date.fromisoformat)
+        parser.add_argument("--end", type=datetime.date.fromisoformat)
+
+    def handle(self, *args, **options):
+        rebuild_sales_rollups(options["start"], options["end"])
+        rebuild_popularity()
+        self.stdout.write("Sales rollups rebuilt.")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.job_queue import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs on a thread or process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--pool", choices=["thread", "process"], default="thread")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Jobs claimed per round; defaults to twice the workers.",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no job is due."
+        )
+
+    def handle(self, *args, **options):
+        ran = run_worker(
+            workers=options["workers"],
+            pool=options["pool"],
+            batch_size=options["batch_size"],
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+        )
+        self.stdout.write(f"Ran {ran} jobs.")
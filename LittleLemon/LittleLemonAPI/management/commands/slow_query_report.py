@@ -0,0 +1,58 @@
+import json
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregate the slow query log by query fingerprint and print the "
+        "queries that cost the most in total, with their views and plans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument("--view", help="Only include queries run by this view.")
+
+    def handle(self, *args, **options):
+        stats = {}
+        log = Path(settings.SLOW_QUERY_LOG)
+        for path in (log.with_name(f"{log.name}.1"), log):
+            if not path.exists():
+                continue
+            for line in path.read_text().splitlines():
+                entry = json.loads(line)
+                if options["view"] and entry["view"] != options["view"]:
+                    continue
+                stat = stats.setdefault(
+                    entry["fingerprint"],
+                    {"sql": entry["sql"], "durations": [], "views": Counter()},
+                )
+                stat["durations"].append(entry["duration"])
+                stat["views"][entry["view"]] += 1
+                stat["plan"] = entry["plan"] or stat.get("plan")
+                stat["last_seen"] = entry["time"]
+
+        if not stats:
+            self.stdout.write("No slow queries logged.")
+            return
+        ranked = sorted(stats.items(), key=lambda item: -sum(item[1]["durations"]))
+        for fingerprint, stat in ranked[: options["limit"]]:
+            durations = stat["durations"]
+            views = ", ".join(
+                f"{view} ({count})" for view, count in stat["views"].most_common(3)
+            )
+            self.stdout.write(
+                f"{fingerprint}: {len(durations)} slow, "
+                f"total {sum(durations) * 1000:.0f} ms, "
+                f"mean {sum(durations) / len(durations) * 1000:.1f} ms, "
+                f"max {max(durations) * 1000:.1f} ms, last {stat['last_seen']}\n"
+                f"  views: {views}\n"
+                f"  {stat['sql']}"
+            )
+            if stat.get("plan"):
+                for row in stat["plan"].splitlines():
+                    self.stdout.write(f"  plan: {row}")
+            self.stdout.write("")
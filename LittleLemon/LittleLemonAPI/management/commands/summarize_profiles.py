@@ -0,0 +1,63 @@
+import json
+import pstats
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI.slow_queries import normalize_sql
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the request profiles in PROFILE_DIR and print the hottest "
+        "functions, who calls them, and the costliest SQL statements."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path", help="Only include requests whose path starts with this."
+        )
+        parser.add_argument(
+            "--sort", choices=["cumulative", "tottime", "ncalls"], default="tottime"
+        )
+        parser.add_argument("--limit", type=int, default=20)
+
+    def handle(self, *args, **options):
+        captures = []
+        for prof in sorted(Path(settings.PROFILE_DIR).glob("*.prof")):
+            try:
+                meta = json.loads(prof.with_suffix(".json").read_text())
+            except FileNotFoundError:
+                continue
+            if options["path"] and not meta["path"].startswith(options["path"]):
+                continue
+            captures.append((prof, meta))
+        if not captures:
+            raise CommandError(f"No matching profiles in {settings.PROFILE_DIR}.")
+
+        durations = sorted(meta["duration"] for _, meta in captures)
+        self.stdout.write(
+            f"{len(captures)} requests, "
+            f"median {durations[len(durations) // 2] * 1000:.1f} ms, "
+            f"max {durations[-1] * 1000:.1f} ms\n"
+        )
+
+        stats = pstats.Stats(*(str(prof) for prof, _ in captures), stream=self.stdout)
+        stats.sort_stats(options["sort"]).print_stats(options["limit"])
+        # The call paths into the hottest functions.
+        stats.print_callers(min(options["limit"], 10))
+
+        # Group statements that differ only in their literal values.
+        queries = defaultdict(lambda: [0, 0.0])
+        for _, meta in captures:
+            for query in meta["queries"]:
+                sql = normalize_sql(query["sql"])
+                queries[sql][0] += 1
+                queries[sql][1] += float(query["time"])
+        self.stdout.write("Costliest SQL (count, total seconds):")
+        for sql, (count, total) in sorted(
+            queries.items(), key=lambda item: item[1][1], reverse=True
+        )[: options["limit"]]:
+            self.stdout.write(f"{count:6d} {total:9.3f}  {sql[:200]}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Warm the shared cache with group ids, the catalog version and "
+        "WARMUP_PATHS, e.g. after a deploy or a cache flush."
+    )
+
+    def handle(self, *args, **options):
+        for step, elapsed in warm_up().items():
+            self.stdout.write(f"{step}: {elapsed * 1000:.1f} ms")
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_open_orders(apps, schema_editor):
+    Order = apps.get_model("LittleLemonAPI", "Order")
+    DeliveryCrewLoad = apps.get_model("LittleLemonAPI", "DeliveryCrewLoad")
+    counts = (
+        Order.objects.filter(delivery_crew__isnull=False, status=False)
+        .values_list("delivery_crew")
+        .annotate(open_orders=models.Count("id"))
+    )
+    DeliveryCrewLoad.objects.bulk_create(
+        DeliveryCrewLoad(user_id=crew_id, open_orders=count)
+        for crew_id, count in counts
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("LittleLemonAPI", "0004_alter_orderitem_order"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeliveryCrewLoad",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="delivery_load",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("open_orders", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["open_orders", "user"],
+                        name="LittleLemon_open_or_6fe9fa_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_open_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+from django.db import migrations, models
+
+
+def backfill_popularity(apps, schema_editor):
+    MenuItem = apps.get_model("LittleLemonAPI", "MenuItem")
+    OrderItem = apps.get_model("LittleLemonAPI", "OrderItem")
+    sold = OrderItem.objects.values_list("menuitem").annotate(
+        units=models.Sum("quantity")
+    )
+    MenuItem.objects.bulk_update(
+        [MenuItem(id=menuitem_id, popularity=units) for menuitem_id, units in sold],
+        ["popularity"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("LittleLemonAPI", "0007_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="menuitem",
+            name="popularity",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
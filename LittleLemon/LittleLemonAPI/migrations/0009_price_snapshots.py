@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+
+def backfill_prices(apps, schema_editor):
+    MenuItem = apps.get_model("LittleLemonAPI", "MenuItem")
+    menu_price = models.Subquery(
+        MenuItem.objects.filter(pk=models.OuterRef("menuitem_id")).values("price")[:1]
+    )
+    for model_name in ("Cart", "OrderItem"):
+        model = apps.get_model("LittleLemonAPI", model_name)
+        model.objects.update(unit_price=menu_price)
+        model.objects.update(price=models.F("quantity") * models.F("unit_price"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("LittleLemonAPI", "0008_menuitem_popularity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="price",
+            field=models.DecimalField(decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="price",
+            field=models.DecimalField(decimal_places=2, max_digits=6, null=True),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="cart",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=6),
+        ),
+        migrations.AlterField(
+            model_name="cart",
+            name="price",
+            field=models.DecimalField(decimal_places=2, max_digits=6),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=6),
+        ),
+        migrations.AlterField(
+            model_name="orderitem",
+            name="price",
+            field=models.DecimalField(decimal_places=2, max_digits=6),
+        ),
+    ]
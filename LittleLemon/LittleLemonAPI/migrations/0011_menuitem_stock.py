@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("LittleLemonAPI", "0010_orderdocument"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="menuitem",
+            name="stock",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
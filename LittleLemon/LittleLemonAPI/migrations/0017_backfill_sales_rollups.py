@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    # Orders placed before the rollups existed were never counted. Archived
+    # orders count too, so rebuild from both tables.
+    daily, daily_items = {}, {}
+    for order_name, item_name in (
+        ("Order", "OrderItem"),
+        ("ArchivedOrder", "ArchivedOrderItem"),
+    ):
+        Order = apps.get_model("LittleLemonAPI", order_name)
+        OrderItem = apps.get_model("LittleLemonAPI", item_name)
+        for row in Order.objects.values("date").annotate(
+            orders=models.Count("id"), revenue=models.Sum("total")
+        ):
+            totals = daily.setdefault(row["date"], {"orders": 0, "revenue": 0})
+            totals["orders"] += row["orders"]
+            totals["revenue"] += row["revenue"]
+        for row in OrderItem.objects.values("order__date", "menuitem").annotate(
+            units=models.Sum("quantity"), sales=models.Sum("price")
+        ):
+            totals = daily_items.setdefault(
+                (row["order__date"], row["menuitem"]), {"quantity": 0, "revenue": 0}
+            )
+            totals["quantity"] += row["units"]
+            totals["revenue"] += row["sales"]
+
+    DailySales = apps.get_model("LittleLemonAPI", "DailySales")
+    DailyMenuItemSales = apps.get_model("LittleLemonAPI", "DailyMenuItemSales")
+    DailySales.objects.all().delete()
+    DailyMenuItemSales.objects.all().delete()
+    DailySales.objects.bulk_create(
+        (DailySales(date=date, **totals) for date, totals in daily.items()),
+        batch_size=1000,
+    )
+    DailyMenuItemSales.objects.bulk_create(
+        (
+            DailyMenuItemSales(date=date, menuitem_id=menuitem_id, **totals)
+            for (date, menuitem_id), totals in daily_items.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("LittleLemonAPI", "0016_cart_timestamps"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+def order_document(order, items) -> dict:
+    # OrderSerializer's output at the time of this migration. Later changes
+    # to the document are for check_order_documents --fix, not this backfill.
+    return {
+        "id": order.id,
+        "user": {"id": order.user_id, "username": order.user.username},
+        "delivery_crew": order.delivery_crew_id,
+        "status": order.status,
+        "total": f"{order.total:.2f}",
+        "date": order.date.isoformat(),
+        "version": order.version,
+        "items": [
+            {
+                "id": item.id,
+                "menuitem": item.menuitem_id,
+                "quantity": item.quantity,
+                "unit_price": f"{item.unit_price:.2f}",
+                "price": f"{item.price:.2f}",
+            }
+            for item in items
+        ],
+    }
+
+
+def backfill_order_documents(apps, schema_editor):
+    # Orders placed before the read model existed have no document, so they
+    # would be missing from the customer and crew order lists.
+    Order = apps.get_model("LittleLemonAPI", "Order")
+    OrderDocument = apps.get_model("LittleLemonAPI", "OrderDocument")
+    orders = (
+        Order.objects.filter(document__isnull=True)
+        .select_related("user")
+        .prefetch_related("orderitem_set")
+        .order_by("id")
+    )
+    last_id = 0
+    while batch := list(orders.filter(id__gt=last_id)[:500]):
+        last_id = batch[-1].id
+        OrderDocument.objects.bulk_create(
+            OrderDocument(
+                order_id=order.id,
+                user_id=order.user_id,
+                delivery_crew_id=order.delivery_crew_id,
+                status=order.status,
+                total=order.total,
+                date=order.date,
+                document=order_document(order, order.orderitem_set.all()),
+            )
+            for order in batch
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("LittleLemonAPI", "0017_backfill_sales_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_documents, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class Category(models.Model):
@@ -12,12 +13,31 @@ class MenuItem(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2, db_index=True)
     featured = models.BooleanField(db_index=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
+    popularity = models.PositiveIntegerField(default=0, db_index=True)
+    # None means the item is not stock-tracked.
+    stock = models.PositiveIntegerField(null=True, blank=True)
 
 
-class Cart(models.Model):
+class PriceSnapshotMixin(models.Model):
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.menuitem.price
+        self.price = self.quantity * self.unit_price
+        super().save(*args, **kwargs)
+
+
+class Cart(PriceSnapshotMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.SmallIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("menuitem", "user")
@@ -31,12 +51,136 @@ class Order(models.Model):
     status = models.BooleanField(db_index=True, default=0)
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True)
+    # Incremented by every update; see OrderDetail for the If-Match contract.
+    version = models.PositiveIntegerField(default=1)
 
 
-class OrderItem(models.Model):
+class OrderItem(PriceSnapshotMixin, models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.SmallIntegerField()
 
     class Meta:
         unique_together = ("order", "menuitem")
+
+
+class DeliveryCrewLoad(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="delivery_load"
+    )
+    open_orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["open_orders", "user"])]
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=JSONEncoder)
+    created = models.DateTimeField(auto_now_add=True)
+    expires = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+
+class DailyMenuItemSales(models.Model):
+    date = models.DateField()
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("date", "menuitem")
+
+
+class OrderDocument(models.Model):
+    order = models.OneToOneField(
+        Order, on_delete=models.CASCADE, primary_key=True, related_name="document"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    delivery_crew = models.ForeignKey(
+        User, on_delete=models.SET_NULL, related_name="+", null=True
+    )
+    status = models.BooleanField(db_index=True)
+    total = models.DecimalField(max_digits=6, decimal_places=2)
+    date = models.DateField(db_index=True)
+    document = models.JSONField(encoder=JSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "order"]),
+            models.Index(fields=["delivery_crew", "order"]),
+        ]
+
+
+class ArchivedOrder(models.Model):
+    # Keeps the id the order had in the hot table.
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    delivery_crew = models.ForeignKey(
+        User, on_delete=models.SET_NULL, related_name="+", null=True
+    )
+    status = models.BooleanField(default=True)
+    total = models.DecimalField(max_digits=6, decimal_places=2)
+    date = models.DateField(db_index=True)
+    document = models.JSONField(encoder=JSONEncoder)
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"]),
+            models.Index(fields=["delivery_crew", "date"]),
+        ]
+
+
+class ArchivedOrderItem(PriceSnapshotMixin, models.Model):
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE)
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    quantity = models.SmallIntegerField()
+
+    class Meta:
+        unique_together = ("order", "menuitem")
+
+
+class Job(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, encoder=JSONEncoder)
+    state = models.CharField(max_length=10, choices=STATES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    run_after = models.DateTimeField()
+    # A running job whose lease has expired is assumed lost and is retried.
+    locked_until = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["state", "run_after"])]
+
+
+class OutboxEvent(models.Model):
+    endpoint = models.URLField(max_length=500)
+    event = models.JSONField(encoder=JSONEncoder)
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # None once delivery has been given up on.
+    next_attempt = models.DateTimeField(null=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["endpoint", "id"])]
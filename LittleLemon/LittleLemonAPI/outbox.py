@@ -0,0 +1,138 @@
+import datetime
+import http.client
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def write_outbox(events: list[dict]) -> None:
+    """Queue ``events`` for every webhook in the current transaction."""
+    now = timezone.now()
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(endpoint=endpoint, event=event, next_attempt=now)
+        for endpoint in settings.ORDER_WEBHOOK_URLS
+        for event in events
+    )
+
+
+class DeliveryError(Exception):
+    pass
+
+
+class WebhookClient:
+    """POST JSON to webhooks over one kept-alive connection per host."""
+
+    def __init__(self, timeout: float | None = None):
+        self.timeout = timeout or settings.OUTBOX_TIMEOUT
+        self._connections = {}
+
+    def _connection(self, url):
+        key = (url.scheme, url.hostname, url.port)
+        if key not in self._connections:
+            connection_class = (
+                http.client.HTTPSConnection
+                if url.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            self._connections[key] = connection_class(
+                url.hostname, url.port, timeout=self.timeout
+            )
+        return key, self._connections[key]
+
+    def post(self, endpoint: str, body: bytes) -> None:
+        url = urlsplit(endpoint)
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+        headers = {"Content-Type": "application/json"}
+        for retry in (True, False):
+            key, connection = self._connection(url)
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.HTTPException, OSError) as exc:
+                self._connections.pop(key).close()
+                # A kept-alive connection the server already closed fails on
+                # first use; retry once on a fresh one.
+                if retry and isinstance(exc, (ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise DeliveryError(str(exc)) from exc
+            if response.will_close:
+                self._connections.pop(key).close()
+            if not 200 <= response.status < 300:
+                raise DeliveryError(f"HTTP {response.status} {response.reason}")
+            return
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+
+def retry_delay(attempts: int) -> datetime.timedelta:
+    return datetime.timedelta(
+        seconds=min(
+            settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+            settings.OUTBOX_RETRY_MAX_DELAY,
+        )
+    )
+
+
+def dispatch_endpoint(client: WebhookClient, endpoint: str, batch_size: int) -> int:
+    """Deliver the oldest pending events of one endpoint; return how many.
+
+    Events are sent in id order, and a failed batch holds back everything
+    after it until it is retried, so each endpoint sees events in order.
+    """
+    batch = list(
+        OutboxEvent.objects.filter(endpoint=endpoint, next_attempt__isnull=False)
+        .order_by("id")
+        .only("id", "event", "attempts", "next_attempt")[:batch_size]
+    )
+    if not batch or batch[0].next_attempt > timezone.now():
+        return 0
+    body = json.dumps(
+        {"events": [{"id": row.id, **row.event} for row in batch]}, cls=JSONEncoder
+    ).encode()
+    ids = [row.id for row in batch]
+    try:
+        client.post(endpoint, body)
+    except DeliveryError as exc:
+        logger.warning("Delivering %d events to %s failed: %s", len(ids), endpoint, exc)
+        failed = OutboxEvent.objects.filter(id__in=ids)
+        failed.update(
+            attempts=F("attempts") + 1,
+            next_attempt=timezone.now() + retry_delay(batch[0].attempts + 1),
+            last_error=str(exc),
+        )
+        failed.filter(attempts__gte=settings.OUTBOX_MAX_ATTEMPTS).update(
+            next_attempt=None
+        )
+        return 0
+    OutboxEvent.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def dispatch_outbox(client: WebhookClient, batch_size: int | None = None) -> int:
+    """Deliver one batch per endpoint; return the number of events delivered."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    endpoints = (
+        OutboxEvent.objects.filter(next_attempt__lte=timezone.now())
+        .values_list("endpoint", flat=True)
+        .distinct()
+    )
+    # No transaction is held across the HTTP calls. Delivery is at least
+    # once: consumers should ignore event ids they have already seen.
+    return sum(
+        dispatch_endpoint(client, endpoint, batch_size) for endpoint in list(endpoints)
+    )
@@ -0,0 +1,29 @@
+import codecs
+import csv
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+def parse_csv(stream, encoding: str = "utf-8") -> list[dict]:
+    if codecs.lookup(encoding).name == "utf-8":
+        # Spreadsheet exports commonly prepend a byte order mark.
+        encoding = "utf-8-sig"
+    reader = csv.DictReader(codecs.getreader(encoding)(stream))
+    try:
+        return [
+            {key.strip(): value.strip() for key, value in row.items() if key and value}
+            for row in reader
+        ]
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ParseError(f"CSV parse error - {exc}")
+
+
+class CSVParser(BaseParser):
+    media_type = "text/csv"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        return parse_csv(stream, encoding)
@@ -1,6 +1,6 @@
 from rest_framework import permissions
 
-from .helpers import is_customer, is_manager
+from .helpers import is_customer, is_delivery_crew, is_manager
 
 
 class ManagerAllCustomerAndDeliveryCrewReadOnly(permissions.BasePermission):
@@ -58,3 +58,14 @@ class OrderDetailPermission(permissions.BasePermission):
             return False
 
         return True
+
+
+class OrderBulkUpdatePermission(permissions.BasePermission):
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+
+        if request.user.is_superuser:
+            return True
+
+        return is_manager(request.user) or is_delivery_crew(request.user)
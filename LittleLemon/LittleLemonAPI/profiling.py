@@ -0,0 +1,97 @@
+import cProfile
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+HEADER = "X-Profile"
+QUERY_PARAM = "profile"
+
+# cProfile allows one active profiler per process on Python 3.12+.
+profiling = threading.Lock()
+
+
+def requested_by_superuser(request) -> bool:
+    """Whether the request asks to be profiled with a superuser's token."""
+    if not (request.headers.get(HEADER) or request.GET.get(QUERY_PARAM)):
+        return False
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b"token":
+        return False
+    try:
+        user, _ = TokenAuthentication().authenticate_credentials(auth[1].decode())
+    except (exceptions.AuthenticationFailed, UnicodeError):
+        return False
+    return user.is_superuser
+
+
+def save_profile(profile: cProfile.Profile, meta: dict) -> str:
+    """Write a profile and its metadata to PROFILE_DIR; return its id.
+
+    Only the newest PROFILE_KEEP profiles are kept.
+    """
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}"
+    profile.dump_stats(directory / f"{profile_id}.prof")
+    (directory / f"{profile_id}.json").write_text(json.dumps(meta, indent=1))
+    for old in sorted(directory.glob("*.prof"))[: -settings.PROFILE_KEEP]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".json").unlink(missing_ok=True)
+    return profile_id
+
+
+class ProfilingMiddleware:
+    """Profile a request with cProfile and record its SQL.
+
+    A superuser triggers it for one request with an ``X-Profile`` header or a
+    ``profile`` query parameter, authenticated with their token. A fraction
+    PROFILE_SAMPLE_RATE of all requests is profiled as well. The response
+    names the capture in an ``X-Profile-Id`` header; summarize captures with
+    ``manage.py summarize_profiles``. One request per process is profiled at
+    a time; requests that overlap it run unprofiled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILE_SAMPLE_RATE
+        if not (sampled or requested_by_superuser(request)):
+            return self.get_response(request)
+        if not profiling.acquire(blocking=False):
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                profile.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profile.disable()
+        finally:
+            profiling.release()
+        profile_id = save_profile(
+            profile,
+            {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "sampled": sampled,
+                "duration": time.perf_counter() - started,
+                "queries": queries.captured_queries,
+            },
+        )
+        response[f"{HEADER}-Id"] = profile_id
+        return response
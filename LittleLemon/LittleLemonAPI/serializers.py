@@ -1,6 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from .models import Cart, Category, MenuItem, Order, OrderItem
+from .models import Cart, Category, DailySales, MenuItem, Order, OrderItem
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -15,7 +16,35 @@ class MenuItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = MenuItem
-        fields = ["id", "title", "price", "featured", "category_id", "category"]
+        fields = [
+            "id",
+            "title",
+            "price",
+            "featured",
+            "stock",
+            "category_id",
+            "category",
+        ]
+
+    def update(self, instance, validated_data):
+        # Write only the submitted columns, so an edit never overwrites stock
+        # decremented by a checkout since the item was read.
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class BestSellerSerializer(MenuItemSerializer):
+    sold = serializers.IntegerField(read_only=True)
+
+    class Meta(MenuItemSerializer.Meta):
+        fields = MenuItemSerializer.Meta.fields + ["sold"]
+
+
+class BestSellersQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(required=False, min_value=1, max_value=366)
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
 
 
 class UserIdSerializer(serializers.Serializer):
@@ -28,12 +57,16 @@ class ReadOnlyUserIdSerializer(serializers.Serializer):
     username = serializers.CharField(max_length=255, read_only=True)
 
 
+class UserIdListSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+
+
 class CartSerializer(serializers.ModelSerializer):
     user = UserIdSerializer(read_only=True)
     menuitem_id = serializers.IntegerField(write_only=True)
     menuitem = MenuItemSerializer(read_only=True)
-    unit_price = serializers.SerializerMethodField("get_unit_price")
-    price = serializers.SerializerMethodField("get_price")
 
     class Meta:
         model = Cart
@@ -46,12 +79,22 @@ class CartSerializer(serializers.ModelSerializer):
             "unit_price",
             "price",
         ]
-
-    def get_unit_price(self, obj):
-        return obj.menuitem.price
-
-    def get_price(self, obj):
-        return obj.quantity * self.get_unit_price(obj)
+        read_only_fields = ["unit_price", "price"]
+
+    def validate(self, attrs):
+        menuitem = (
+            MenuItem.objects.filter(pk=attrs.pop("menuitem_id"))
+            .only("price", "stock")
+            .first()
+        )
+        if menuitem is None:
+            raise serializers.ValidationError({"menuitem_id": "Menu item not found."})
+        if menuitem.stock is not None and menuitem.stock < attrs["quantity"]:
+            raise serializers.ValidationError(
+                {"menuitem_id": "Not enough of this item in stock."}
+            )
+        attrs["menuitem"] = menuitem
+        return attrs
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -59,34 +102,57 @@ class OrderSerializer(serializers.ModelSerializer):
     items = serializers.SerializerMethodField("get_items")
 
     def get_items(self, obj):
-        order_items = OrderItem.objects.filter(order=obj)
-        return OrderItemSerializer(order_items, many=True).data
+        return OrderItemSerializer(obj.orderitem_set.all(), many=True).data
 
     class Meta:
         model = Order
-        fields = ["id", "user", "delivery_crew", "status", "total", "date", "items"]
+        fields = [
+            "id",
+            "user",
+            "delivery_crew",
+            "status",
+            "total",
+            "date",
+            "version",
+            "items",
+        ]
+        read_only_fields = ["version"]
 
 
 class OrderSerializerForManager(OrderSerializer):
     class Meta(OrderSerializer.Meta):
-        read_only_fields = ["id", "user", "total", "date", "items"]
+        read_only_fields = ["id", "user", "total", "date", "version", "items"]
 
 
 class OrderSerializerForDeliveryCrew(OrderSerializer):
     class Meta(OrderSerializer.Meta):
-        read_only_fields = ["id", "user", "delivery_crew", "total", "date", "items"]
+        read_only_fields = [
+            "id",
+            "user",
+            "delivery_crew",
+            "total",
+            "date",
+            "version",
+            "items",
+        ]
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    unit_price = serializers.SerializerMethodField("get_unit_price")
-    price = serializers.SerializerMethodField("get_price")
+class OrderDocumentSerializer(serializers.BaseSerializer):
+    def to_representation(self, instance):
+        return instance.document
+
+
+class OrderBulkUpdateItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.BooleanField(required=False)
+    delivery_crew = serializers.IntegerField(required=False, allow_null=True)
+
 
-    def get_unit_price(self, obj):
-        return obj.menuitem.price
+class OrderBulkUpdateSerializer(serializers.Serializer):
+    orders = OrderBulkUpdateItemSerializer(many=True, allow_empty=False, max_length=500)
 
-    def get_price(self, obj):
-        return obj.quantity * self.get_unit_price(obj)
 
+class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ["id", "menuitem", "quantity", "unit_price", "price"]
@@ -97,3 +163,52 @@ class OrderItemSerializer(serializers.ModelSerializer):
             "unit_price",
             "price",
         ]
+
+
+class SalesRangeSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if "start" in attrs and "end" in attrs and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must not be after end.")
+        return attrs
+
+
+class DailySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailySales
+        fields = ["date", "orders", "revenue"]
+
+
+class MenuItemSalesSerializer(serializers.Serializer):
+    menuitem = serializers.IntegerField()
+    title = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CategorySalesSerializer(serializers.Serializer):
+    category = serializers.IntegerField()
+    title = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class BatchEntrySerializer(serializers.Serializer):
+    method = serializers.ChoiceField(["GET", "POST", "PUT", "PATCH", "DELETE"])
+    path = serializers.RegexField(r"^/api/(?!batch\b)", max_length=2000)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchEntrySerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"At most {settings.BATCH_MAX_REQUESTS} requests per batch."
+            )
+        return value
@@ -0,0 +1,11 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .helpers import forget_group_id
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_id(sender, instance, **kwargs):
+    forget_group_id(instance.name)
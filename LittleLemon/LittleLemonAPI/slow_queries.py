@@ -0,0 +1,117 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+current_request = contextvars.ContextVar("current_request", default=None)
+_explaining = threading.local()
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literal values in ``sql`` so equivalent queries compare equal."""
+    sql = re.sub(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s", "?", sql)
+    return re.sub(r"\(\?(?:, \?)+\)", "(...)", sql)
+
+
+def fingerprint(normalized_sql: str) -> str:
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+def current_view() -> str:
+    request = current_request.get()
+    if request is None:
+        return "-"
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else request.path
+
+
+def explain(connection, sql: str, params) -> str | None:
+    if not re.match(r"\s*(SELECT|WITH)\b", sql, re.IGNORECASE):
+        return None
+    prefix = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+    _explaining.active = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            return "\n".join(
+                " ".join(str(column) for column in row) for row in cursor.fetchall()
+            )
+    except DatabaseError:
+        return None
+    finally:
+        _explaining.active = False
+
+
+def write_entry(entry: dict) -> None:
+    path = settings.SLOW_QUERY_LOG
+    try:
+        if os.path.getsize(path) > settings.SLOW_QUERY_LOG_MAX_BYTES:
+            os.replace(path, f"{path}.1")
+    except FileNotFoundError:
+        pass
+    with open(path, "a") as log:
+        log.write(json.dumps(entry) + "\n")
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Execute wrapper logging queries slower than SLOW_QUERY_THRESHOLD."""
+    if getattr(_explaining, "active", False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if threshold is None or duration < threshold:
+        return result
+
+    normalized = normalize_sql(sql)
+    entry = {
+        "time": timezone.now().isoformat(),
+        "fingerprint": fingerprint(normalized),
+        "sql": normalized,
+        "duration": duration,
+        "view": current_view(),
+        "plan": None if many else explain(context["connection"], sql, params),
+    }
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s", duration * 1000, entry["view"], normalized
+    )
+    try:
+        write_entry(entry)
+    except OSError:
+        # The query succeeded; a full disk must not fail the request.
+        logger.exception("Could not write to %s", settings.SLOW_QUERY_LOG)
+    return result
+
+
+def install(connection, **kwargs):
+    """Add the slow query wrapper to each new database connection."""
+    if (
+        settings.SLOW_QUERY_THRESHOLD is not None
+        and log_slow_queries not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+class SlowQueryMiddleware:
+    """Attribute slow queries to the view of the request that ran them."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            current_request.reset(token)
@@ -1,11 +1,63 @@
+import asyncio
+import datetime
+import heapq
+import json
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
+from django.apps import apps
 from django.contrib.auth.models import Group, User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import F, QuerySet
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
-from .models import Cart, Category, MenuItem, Order, OrderItem
+from .analytics import rebuild_sales_rollups
+from .assignment import adjust_crew_loads, assign_open_orders, rebuild_crew_loads
+from .cart_storage import expire_carts
+from .coalescing import SingleFlight, single_flight
+from .documents import refresh_order_documents
+from .events import broker, order_events
+from .helpers import bump_catalog_version, get_group_id
+from .idempotency import claim_key, purge_expired_keys
+from .job_queue import execute_job, job, run_pending_jobs
+from .load_shedding import ConcurrencyLimit, get_limit, reset_limit
+from .models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Cart,
+    Category,
+    DailyMenuItemSales,
+    DailySales,
+    DeliveryCrewLoad,
+    IdempotencyKey,
+    Job,
+    MenuItem,
+    Order,
+    OrderDocument,
+    OrderItem,
+    OutboxEvent,
+)
+from .outbox import WebhookClient, dispatch_outbox
+from .profiling import profiling
+from .serializers import MenuItemSerializer
+from .slow_queries import normalize_sql
+from .views import MenuItemList, OrderDetail
+from .warmup import warm_up
 
 # ---------------------------------------------------------------------------- #
 #               User registration and token generation endpoints               #
@@ -224,6 +276,145 @@ class MenuItemsTestCase(TestCase):
         self.assertEqual(response.status_code, 204)
 
 
+class MenuItemBulkImportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token))
+        self.user.groups.add(Group.objects.create(name="Manager"))
+        self.category = Category.objects.create(slug="main-course", title="Main Course")
+
+    def test_bulk_import_json_creates_and_updates(self):
+        # given
+        pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=self.category
+        )
+        rows = [
+            {"id": pasta.id, "price": "13.49"},
+            {
+                "title": "Salad",
+                "price": "7.99",
+                "featured": True,
+                "category_id": self.category.id,
+            },
+        ]
+
+        # when
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                "/api/menu-items/bulk", rows, content_type="application/json"
+            )
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"created": 1, "updated": 1})
+        pasta.refresh_from_db()
+        self.assertEqual(str(pasta.price), "13.49")
+        self.assertTrue(MenuItem.objects.filter(title="Salad").exists())
+
+    def test_bulk_import_csv_upload(self):
+        # given
+        body = (
+            "title,price,featured,category_id\n"
+            f"Burger,9.99,false,{self.category.id}\n"
+            f"Soup,4.50,true,{self.category.id}\n"
+        )
+
+        # when
+        response = self.client.post(
+            "/api/menu-items/bulk", body, content_type="text/csv"
+        )
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertTrue(MenuItem.objects.get(title="Soup").featured)
+
+    def test_bulk_import_reports_row_errors_and_writes_nothing(self):
+        # given
+        rows = [
+            {"title": "Burger", "price": "9.99", "featured": False, "category_id": 999},
+            {"title": "Soup", "featured": False, "category_id": self.category.id},
+            {"id": 999, "price": "1.00"},
+            {
+                "title": "Salad",
+                "price": "7.99",
+                "featured": True,
+                "category_id": self.category.id,
+            },
+        ]
+
+        # when
+        response = self.client.post(
+            "/api/menu-items/bulk", rows, content_type="application/json"
+        )
+
+        # then
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [0, 1, 2])
+        self.assertIn("category_id", response.data["errors"][0]["errors"])
+        self.assertIn("price", response.data["errors"][1]["errors"])
+        self.assertEqual(MenuItem.objects.count(), 0)
+
+    def test_bulk_import_bumps_catalog_version_once(self):
+        # given
+        rows = [
+            {
+                "title": f"Dish {i}",
+                "price": "5.00",
+                "featured": False,
+                "category_id": self.category.id,
+            }
+            for i in range(10)
+        ]
+        self.enterContext(self.settings(CATALOG_ETAGS=True))
+        etag = self.client.get("/api/menu-items/")["ETag"]
+
+        # when
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post(
+                "/api/menu-items/bulk", rows, content_type="application/json"
+            )
+
+        # then
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(self.client.get("/api/menu-items/")["ETag"], etag)
+
+    def test_bulk_import_forbidden_for_non_manager(self):
+        # given
+        self.user.groups.clear()
+
+        # when
+        response = self.client.post(
+            "/api/menu-items/bulk", [], content_type="application/json"
+        )
+
+        # then
+        self.assertEqual(response.status_code, 403)
+
+    def test_menu_items_not_modified_when_catalog_unchanged(self):
+        # given
+        self.enterContext(self.settings(CATALOG_ETAGS=True))
+        etag = self.client.get("/api/menu-items/")["ETag"]
+
+        # when
+        response = self.client.get("/api/menu-items/", HTTP_IF_NONE_MATCH=etag)
+
+        # then
+        self.assertEqual(response.status_code, 304)
+
+    def test_menu_items_have_no_etag_without_catalog_etags(self):
+        # when
+        response = self.client.get("/api/menu-items/")
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+
 # ---------------------------------------------------------------------------- #
 #                        User group management endpoints                       #
 # ---------------------------------------------------------------------------- #
@@ -352,6 +543,83 @@ class UserGroupManagementTestCase(TestCase):
         self.assertNotIn(self.user, delivery_crew_group.user_set.all())
 
 
+class GroupMemberBulkTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token))
+        self.user.groups.add(Group.objects.create(name="Manager"))
+        self.delivery_crew_group = Group.objects.create(name="Delivery Crew")
+        self.crew = [
+            User.objects.create_user(username=f"crew_{i}", password="Password123!")
+            for i in range(5)
+        ]
+
+    def test_bulk_add_delivery_crew(self):
+        # given
+        ids = [user.id for user in self.crew]
+        self.client.post("/api/groups/delivery-crew/users/bulk", {"ids": ids[:1]})
+
+        # when
+        with self.assertNumQueries(4):
+            response = self.client.post(
+                "/api/groups/delivery-crew/users/bulk",
+                {"ids": ids},
+                content_type="application/json",
+            )
+
+        # then
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.delivery_crew_group.user_set.count(), 5)
+
+    def test_bulk_remove_delivery_crew(self):
+        # given
+        self.delivery_crew_group.user_set.add(*self.crew)
+
+        # when
+        response = self.client.delete(
+            "/api/groups/delivery-crew/users/bulk",
+            {"ids": [user.id for user in self.crew[:3]]},
+            content_type="application/json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["removed"], 3)
+        self.assertEqual(
+            set(self.delivery_crew_group.user_set.all()), set(self.crew[3:])
+        )
+
+    def test_bulk_add_rejects_unknown_users(self):
+        # when
+        response = self.client.post(
+            "/api/groups/manager/users/bulk",
+            {"ids": [self.crew[0].id, 999]},
+            content_type="application/json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.crew[0].groups.exists())
+
+    def test_bulk_endpoints_accessible_only_to_manager(self):
+        # given
+        self.user.groups.clear()
+
+        # when
+        response = self.client.post(
+            "/api/groups/manager/users/bulk",
+            {"ids": [self.user.id]},
+            content_type="application/json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 403)
+
+
 # ---------------------------------------------------------------------------- #
 #                           Cart management endpoints                          #
 # ---------------------------------------------------------------------------- #
@@ -722,3 +990,2361 @@ class OrderManagementTestCase(TestCase):
 
                 # then
                 self.assertEqual(response.status_code, 403)
+
+
+class OrderBulkUpdateTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token))
+        self.customer = User.objects.create_user(
+            username="customer_user", password="Password123!"
+        )
+        self.delivery_person = User.objects.create_user(
+            username="delivery_user", password="Password123!"
+        )
+        self.delivery_person.groups.add(Group.objects.create(name="Delivery Crew"))
+        self.orders = [
+            Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+            for _ in range(4)
+        ]
+
+    def test_bulk_assign_and_status_when_manager(self):
+        # given
+        self.user.groups.add(Group.objects.create(name="Manager"))
+        changes = [
+            {"id": order.id, "delivery_crew": self.delivery_person.id}
+            for order in self.orders
+        ]
+        changes[0]["status"] = True
+        changes[1]["status"] = True
+
+        # when
+        # One UPDATE per distinct (status, crew) pair, not one per order.
+        with self.assertNumQueries(14):
+            response = self.client.patch(
+                "/api/orders/bulk",
+                {"orders": changes + [{"id": 999, "status": True}]},
+                content_type="application/json",
+            )
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["result"] for result in response.data["results"]],
+            ["updated"] * 4 + ["not_found"],
+        )
+        self.assertEqual(
+            Order.objects.filter(delivery_crew=self.delivery_person).count(), 4
+        )
+        self.assertEqual(Order.objects.filter(status=True).count(), 2)
+        # One version bump per order, however many fields changed.
+        self.assertEqual(set(Order.objects.values_list("version", flat=True)), {2})
+
+    def test_bulk_update_queries_do_not_grow_with_orders(self):
+        # given
+        self.user.groups.add(Group.objects.create(name="Manager"))
+        self.orders += [
+            Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+            for _ in range(16)
+        ]
+        changes = [
+            {"id": order.id, "delivery_crew": self.delivery_person.id}
+            for order in self.orders
+        ]
+        changes[0]["status"] = True
+        changes[1]["status"] = True
+
+        # when
+        with self.assertNumQueries(14):
+            response = self.client.patch(
+                "/api/orders/bulk",
+                {"orders": changes + [{"id": 999, "status": True}]},
+                content_type="application/json",
+            )
+
+        # then
+        self.assertEqual(
+            [result["result"] for result in response.data["results"]],
+            ["updated"] * 20 + ["not_found"],
+        )
+        self.assertEqual(set(Order.objects.values_list("version", flat=True)), {2})
+
+    def test_bulk_update_reports_orders_changed_since_read(self):
+        # given
+        self.user.groups.add(Group.objects.create(name="Manager"))
+        in_bulk = QuerySet.in_bulk
+
+        def read_then_changed(queryset, *args, **kwargs):
+            orders = in_bulk(queryset, *args, **kwargs)
+            # Another request updates an order after this one read it.
+            Order.objects.filter(id=self.orders[0].id).update(
+                status=True, version=F("version") + 1
+            )
+            return orders
+
+        # when
+        with mock.patch.object(QuerySet, "in_bulk", read_then_changed):
+            response = self.client.patch(
+                "/api/orders/bulk",
+                {
+                    "orders": [
+                        {"id": order.id, "delivery_crew": self.delivery_person.id}
+                        for order in self.orders[:2]
+                    ]
+                },
+                content_type="application/json",
+            )
+
+        # then
+        self.assertEqual(
+            [result["result"] for result in response.data["results"]],
+            ["conflict", "updated"],
+        )
+        self.assertIsNone(Order.objects.get(id=self.orders[0].id).delivery_crew)
+        self.assertEqual(
+            list(Order.objects.values_list("version", flat=True)), [2, 2, 1, 1]
+        )
+
+    def test_bulk_status_when_delivery_crew_only_on_own_orders(self):
+        # given
+        Order.objects.filter(id__in=[o.id for o in self.orders[:2]]).update(
+            delivery_crew=self.delivery_person
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION="Token {}".format(
+                Token.objects.create(user=self.delivery_person)
+            )
+        )
+
+        # when
+        response = self.client.patch(
+            "/api/orders/bulk",
+            {
+                "orders": [
+                    {"id": self.orders[0].id, "status": True},
+                    {"id": self.orders[1].id, "delivery_crew": None},
+                    {"id": self.orders[2].id, "status": True},
+                ]
+            },
+            content_type="application/json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["result"] for result in response.data["results"]],
+            ["updated", "forbidden", "not_found"],
+        )
+        self.assertEqual(
+            list(Order.objects.filter(status=True).values_list("id", flat=True)),
+            [self.orders[0].id],
+        )
+        self.assertEqual(
+            Order.objects.get(id=self.orders[1].id).delivery_crew,
+            self.delivery_person,
+        )
+
+    def test_bulk_update_forbidden_for_customer(self):
+        # when
+        response = self.client.patch(
+            "/api/orders/bulk",
+            {"orders": [{"id": self.orders[0].id, "status": True}]},
+            content_type="application/json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 403)
+
+
+class DeliveryCrewAssignmentTestCase(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer_user", password="Password123!"
+        )
+        self.delivery_crew_group = Group.objects.create(name="Delivery Crew")
+        self.crew = [
+            User.objects.create_user(username=f"crew_{i}", password="Password123!")
+            for i in range(3)
+        ]
+        self.delivery_crew_group.user_set.add(*self.crew)
+
+    def test_assign_open_orders_balances_load(self):
+        # given
+        busy = self.crew[0]
+        for _ in range(3):
+            Order.objects.create(
+                user=self.customer, delivery_crew=busy, total=9.99, date="2024-01-01"
+            )
+        Order.objects.create(
+            user=self.customer, total=9.99, date="2024-01-01", status=1
+        )
+        for _ in range(7):
+            Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+        rebuild_crew_loads()
+
+        # when
+        assigned = assign_open_orders(batch_size=2)
+
+        # then
+        self.assertEqual(assigned, 7)
+        self.assertFalse(
+            Order.objects.filter(delivery_crew__isnull=True, status=False).exists()
+        )
+        loads = dict(DeliveryCrewLoad.objects.values_list("user_id", "open_orders"))
+        self.assertEqual(sorted(loads.values()), [3, 3, 4])
+        for crew_id, load in loads.items():
+            self.assertEqual(
+                Order.objects.filter(delivery_crew_id=crew_id, status=False).count(),
+                load,
+            )
+
+    def test_assign_open_orders_reads_only_the_least_loaded_crew(self):
+        # given
+        busy = self.crew[0]
+        Order.objects.create(
+            user=self.customer, delivery_crew=busy, total=9.99, date="2024-01-01"
+        )
+        for _ in range(2):
+            Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+        rebuild_crew_loads()
+        heapify = heapq.heapify
+        batches = []
+
+        def record(loads):
+            batches.append(list(loads))
+            heapify(loads)
+
+        # when
+        with mock.patch.object(heapq, "heapify", record):
+            assigned = assign_open_orders()
+
+        # then
+        self.assertEqual(assigned, 2)
+        self.assertEqual(batches, [[(0, self.crew[1].id), (0, self.crew[2].id)]])
+        self.assertEqual(
+            set(
+                Order.objects.filter(delivery_crew__isnull=False).values_list(
+                    "delivery_crew", flat=True
+                )
+            ),
+            {crew.id for crew in self.crew},
+        )
+
+    def test_assign_open_orders_reroutes_batch_changed_meanwhile(self):
+        # given
+        orders = [
+            Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+            for _ in range(4)
+        ]
+        rebuild_crew_loads()
+        heapify = heapq.heapify
+        batches = []
+
+        def assign_first_order_meanwhile(loads):
+            # A manager assigns an order after the first batch was read.
+            if not batches:
+                Order.objects.filter(id=orders[0].id).update(delivery_crew=self.crew[2])
+                adjust_crew_loads(Counter({self.crew[2].id: 1}))
+            batches.append(loads)
+            heapify(loads)
+
+        # when
+        with mock.patch.object(heapq, "heapify", assign_first_order_meanwhile):
+            assigned = assign_open_orders()
+
+        # then
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(assigned, 4)
+        loads = dict(DeliveryCrewLoad.objects.values_list("user_id", "open_orders"))
+        self.assertEqual(sum(loads.values()), 4)
+        for crew_id, load in loads.items():
+            self.assertEqual(
+                Order.objects.filter(delivery_crew_id=crew_id, status=False).count(),
+                load,
+            )
+
+    def test_order_updates_keep_crew_load_counters(self):
+        # given
+        manager = User.objects.create_user(username="manager", password="Password123!")
+        manager.groups.add(Group.objects.create(name="Manager"))
+        client = APIClient()
+        client.force_authenticate(manager)
+        order = Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+        order2 = Order.objects.create(user=self.customer, total=9.99, date="2024-01-01")
+
+        # when
+        client.patch(
+            f"/api/orders/{order.id}",
+            {"delivery_crew": self.crew[0].id},
+            content_type="application/json",
+        )
+        client.patch(
+            "/api/orders/bulk",
+            {"orders": [{"id": order2.id, "delivery_crew": self.crew[1].id}]},
+            content_type="application/json",
+        )
+        client.patch(
+            f"/api/orders/{order.id}", {"status": 1}, content_type="application/json"
+        )
+        client.delete(f"/api/orders/{order2.id}")
+
+        # then
+        self.assertEqual(
+            set(DeliveryCrewLoad.objects.values_list("user_id", "open_orders")),
+            {(self.crew[0].id, 0), (self.crew[1].id, 0)},
+        )
+
+
+class OrderEventsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.delivery_person = User.objects.create_user(
+            username="delivery_user", password="Password123!"
+        )
+        self.delivery_person.groups.add(Group.objects.create(name="Delivery Crew"))
+
+    def test_order_events_for_transitions(self):
+        # when
+        created = order_events(1, 2, None, (None, False))
+        assigned = order_events(1, 2, (None, False), (3, False))
+        delivered = order_events(1, 2, (3, False), (3, True))
+        unchanged = order_events(1, 2, (3, True), (3, True))
+
+        # then
+        self.assertEqual([event["type"] for event in created], ["order.created"])
+        self.assertEqual([event["type"] for event in assigned], ["order.assigned"])
+        self.assertEqual([event["type"] for event in delivered], ["order.status"])
+        self.assertEqual(unchanged, [])
+
+    def test_order_update_publishes_after_commit(self):
+        # given
+        manager = User.objects.create_user(username="manager", password="Password123!")
+        manager.groups.add(Group.objects.create(name="Manager"))
+        client = APIClient()
+        client.force_authenticate(manager)
+        order = Order.objects.create(user=self.user, total=9.99, date="2024-01-01")
+
+        # when
+        with (
+            mock.patch.object(broker, "publish") as publish,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            client.patch(
+                f"/api/orders/{order.id}",
+                {"delivery_crew": self.delivery_person.id, "status": 1},
+                content_type="application/json",
+            )
+
+        # then
+        self.assertEqual(
+            [call.args[0]["type"] for call in publish.call_args_list],
+            ["order.assigned", "order.status"],
+        )
+
+    async def test_event_stream_delivers_only_own_orders(self):
+        # given
+        client = AsyncClient()
+
+        # when
+        response = await client.get(
+            "/api/orders/events", headers={"Authorization": f"Token {self.token}"}
+        )
+        content = aiter(response.streaming_content)
+        first = await anext(content)
+        await asyncio.sleep(0)
+        broker.publish(order_events(1, self.user.id + 100, None, (None, False))[0])
+        broker.publish(order_events(2, self.user.id, None, (None, False))[0])
+        event = await asyncio.wait_for(anext(content), 1)
+        await content.aclose()
+
+        # then
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertTrue(first.startswith(b"retry:"))
+        self.assertIn(b"event: order.created", event)
+        self.assertIn(b'"order": 2', event)
+
+    async def test_event_stream_requires_token(self):
+        # when
+        response = await AsyncClient().get("/api/orders/events")
+
+        # then
+        self.assertEqual(response.status_code, 401)
+
+
+class IdempotencyKeyTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token {}".format(self.token))
+        main_course_category = Category.objects.create(
+            slug="main-course", title="Main Course"
+        )
+        self.menu_item = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=main_course_category
+        )
+
+    def test_retried_checkout_creates_one_order(self):
+        # given
+        Cart.objects.create(user=self.user, menuitem=self.menu_item, quantity=2)
+
+        # when
+        responses = [
+            self.client.post(
+                "/api/orders/",
+                {},
+                content_type="application/json",
+                HTTP_IDEMPOTENCY_KEY="checkout-1",
+            )
+            for _ in range(2)
+        ]
+
+        # then
+        self.assertEqual([r.status_code for r in responses], [201, 201])
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_retried_cart_add_replays_response(self):
+        # given
+        body = {"menuitem_id": self.menu_item.id, "quantity": 3}
+
+        # when
+        first = self.client.post(
+            "/api/cart/menu-items/",
+            body,
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY="cart-1",
+        )
+        with self.assertNumQueries(6):
+            retry = self.client.post(
+                "/api/cart/menu-items/",
+                body,
+                content_type="application/json",
+                HTTP_IDEMPOTENCY_KEY="cart-1",
+            )
+
+        # then
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Cart.objects.count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        # given
+        self.client.post(
+            "/api/cart/menu-items/",
+            {"menuitem_id": self.menu_item.id, "quantity": 3},
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY="cart-1",
+        )
+
+        # when
+        response = self.client.post(
+            "/api/cart/menu-items/",
+            {"menuitem_id": self.menu_item.id, "quantity": 4},
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY="cart-1",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 422)
+
+    def test_concurrent_duplicate_gets_conflict(self):
+        # given
+        claim_key(self.user, "checkout-1", "in-flight")
+
+        # when
+        with mock.patch(
+            "LittleLemonAPI.idempotency.request_fingerprint", return_value="in-flight"
+        ):
+            response = self.client.post(
+                "/api/orders/",
+                {},
+                content_type="application/json",
+                HTTP_IDEMPOTENCY_KEY="checkout-1",
+            )
+
+        # then
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_purge_expired_keys(self):
+        # given
+        for i in range(5):
+            claim_key(self.user, f"key-{i}", "hash")
+        IdempotencyKey.objects.filter(key__in=["key-0", "key-1", "key-2"]).update(
+            expires=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        # when
+        purged = purge_expired_keys(batch_size=2)
+
+        # then
+        self.assertEqual(purged, 3)
+        self.assertEqual(IdempotencyKey.objects.count(), 2)
+
+
+class SalesAnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        self.manager = User.objects.create_user(
+            username="manager", password="Password123!"
+        )
+        self.manager.groups.add(Group.objects.create(name="Manager"))
+        main_course = Category.objects.create(slug="main-course", title="Main Course")
+        dessert = Category.objects.create(slug="dessert", title="Dessert")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=main_course
+        )
+        self.cake = MenuItem.objects.create(
+            title="Cake", price=5.00, featured=False, category=dessert
+        )
+
+    def checkout(self, menu_item, quantity):
+        Cart.objects.create(user=self.user, menuitem=menu_item, quantity=quantity)
+        self.client.post("/api/orders/", {}, content_type="application/json")
+        run_pending_jobs()
+
+    def test_checkout_updates_rollups(self):
+        # given
+        self.checkout(self.pasta, 2)
+        self.checkout(self.cake, 1)
+        self.checkout(self.pasta, 1)
+        self.client.force_authenticate(self.manager)
+
+        # when
+        daily = self.client.get("/api/analytics/sales/daily")
+        menu_items = self.client.get("/api/analytics/sales/menu-items")
+        categories = self.client.get("/api/analytics/sales/categories")
+
+        # then
+        self.assertEqual(daily.status_code, 200)
+        self.assertEqual(daily.data["results"][0]["orders"], 3)
+        self.assertEqual(daily.data["results"][0]["revenue"], "43.97")
+        self.assertEqual(
+            [(row["title"], row["quantity"]) for row in menu_items.data["results"]],
+            [("Pasta", 3), ("Cake", 1)],
+        )
+        self.assertEqual(
+            [(row["title"], row["revenue"]) for row in categories.data["results"]],
+            [("Main Course", "38.97"), ("Dessert", "5.00")],
+        )
+
+    def test_order_deletion_and_rebuild(self):
+        # given
+        self.checkout(self.pasta, 2)
+        self.checkout(self.cake, 1)
+        self.client.force_authenticate(self.manager)
+        order = Order.objects.get(orderitem__menuitem=self.pasta)
+
+        # when
+        self.client.delete(f"/api/orders/{order.id}")
+        run_pending_jobs()
+        expected = list(
+            DailyMenuItemSales.objects.filter(quantity__gt=0).values_list(
+                "menuitem", "quantity"
+            )
+        )
+        DailySales.objects.all().delete()
+        DailyMenuItemSales.objects.all().delete()
+        rebuild_sales_rollups()
+
+        # then
+        self.assertEqual(
+            list(DailySales.objects.values_list("orders", "revenue")),
+            [(1, Decimal("5.00"))],
+        )
+        self.assertEqual(
+            sorted(DailyMenuItemSales.objects.values_list("menuitem", "quantity")),
+            sorted(expected),
+        )
+
+    def test_deleting_order_placed_before_rollups_clamps_at_zero(self):
+        # given
+        self.checkout(self.pasta, 1)
+        # An order placed before the rollups existed, on the same day.
+        older = Order.objects.create(
+            user=self.user, total=100, date=Order.objects.get().date
+        )
+        OrderItem.objects.create(
+            order=older, menuitem=self.pasta, quantity=5, unit_price=20, price=100
+        )
+        self.client.force_authenticate(self.manager)
+
+        # when
+        response = self.client.delete(f"/api/orders/{older.id}")
+        run_pending_jobs()
+
+        # then
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            list(DailySales.objects.values_list("orders", "revenue")),
+            [(0, Decimal("0.00"))],
+        )
+        self.assertEqual(
+            list(DailyMenuItemSales.objects.values_list("quantity", "revenue")),
+            [(0, Decimal("0.00"))],
+        )
+
+    def test_sales_date_range(self):
+        # given
+        DailySales.objects.create(date="2024-01-01", orders=1, revenue=10)
+        DailySales.objects.create(date="2024-01-02", orders=2, revenue=20)
+        DailySales.objects.create(date="2024-01-03", orders=3, revenue=30)
+        self.client.force_authenticate(self.manager)
+
+        # when
+        response = self.client.get(
+            "/api/analytics/sales/daily", {"start": "2024-01-02", "end": "2024-01-03"}
+        )
+
+        # then
+        self.assertEqual([row["orders"] for row in response.data["results"]], [2, 3])
+
+    def test_analytics_forbidden_for_customer(self):
+        # when
+        response = self.client.get("/api/analytics/sales/daily")
+
+        # then
+        self.assertEqual(response.status_code, 403)
+
+
+class MenuItemPopularityTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+        self.salad = MenuItem.objects.create(
+            title="Salad", price=7.99, featured=True, category=category
+        )
+        self.soup = MenuItem.objects.create(
+            title="Soup", price=4.50, featured=False, category=category
+        )
+
+    def checkout(self, menu_item, quantity):
+        Cart.objects.create(user=self.user, menuitem=menu_item, quantity=quantity)
+        self.client.post("/api/orders/", {}, content_type="application/json")
+        run_pending_jobs()
+
+    def test_checkout_increments_popularity(self):
+        # when
+        self.checkout(self.salad, 2)
+        self.checkout(self.salad, 3)
+        self.checkout(self.soup, 1)
+
+        # then
+        self.salad.refresh_from_db()
+        self.soup.refresh_from_db()
+        self.assertEqual(self.salad.popularity, 5)
+        self.assertEqual(self.soup.popularity, 1)
+
+    def test_menu_items_ordered_by_popularity(self):
+        # given
+        self.checkout(self.soup, 4)
+        self.checkout(self.salad, 1)
+
+        # when
+        response = self.client.get("/api/menu-items/", {"ordering": "-popularity"})
+
+        # then
+        self.assertNotIn("ETag", response)
+        self.assertEqual(
+            [item["title"] for item in response.data["results"]],
+            ["Soup", "Salad", "Pasta"],
+        )
+
+    def test_best_sellers(self):
+        # given
+        self.checkout(self.soup, 4)
+        self.checkout(self.salad, 1)
+        DailyMenuItemSales.objects.create(
+            date=timezone.localdate() - datetime.timedelta(days=30),
+            menuitem=self.pasta,
+            quantity=10,
+            revenue=129.90,
+        )
+        MenuItem.objects.filter(pk=self.pasta.pk).update(popularity=10)
+
+        # when
+        all_time = self.client.get("/api/menu-items/best-sellers", {"limit": 2})
+        this_week = self.client.get("/api/menu-items/best-sellers", {"days": 7})
+
+        # then
+        self.assertEqual(
+            [(item["title"], item["sold"]) for item in all_time.data],
+            [("Pasta", 10), ("Soup", 4)],
+        )
+        self.assertEqual(
+            [(item["title"], item["sold"]) for item in this_week.data],
+            [("Soup", 4), ("Salad", 1)],
+        )
+
+
+class PriceSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def test_order_keeps_checkout_price(self):
+        # given
+        self.client.post(
+            "/api/cart/menu-items/",
+            {"menuitem_id": self.pasta.id, "quantity": 2},
+            content_type="application/json",
+        )
+        self.client.post("/api/orders/", {}, content_type="application/json")
+        MenuItem.objects.filter(pk=self.pasta.pk).update(price=15.00)
+
+        # when
+        response = self.client.get("/api/orders/")
+
+        # then
+        order = response.data["results"][0]
+        self.assertEqual(order["total"], "25.98")
+        self.assertEqual(order["items"][0]["unit_price"], "12.99")
+        self.assertEqual(order["items"][0]["price"], "25.98")
+
+    def test_order_list_does_not_query_menu_items(self):
+        # given
+        for _ in range(3):
+            Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=1)
+            self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # when
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/orders/")
+
+        # then
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertFalse(
+            any("LittleLemonAPI_menuitem" in query["sql"] for query in queries)
+        )
+
+
+class OrderDocumentTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.delivery_person = User.objects.create_user(
+            username="delivery_person", password="Password123!"
+        )
+        self.delivery_person.groups.add(Group.objects.create(name="Delivery Crew"))
+        self.manager = User.objects.create_user(
+            username="manager", password="Password123!"
+        )
+        self.manager.groups.add(Group.objects.create(name="Manager"))
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def checkout(self):
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=2)
+        self.client.force_authenticate(self.user)
+        self.client.post("/api/orders/", {}, content_type="application/json")
+        return Order.objects.latest("id")
+
+    def test_checkout_writes_document(self):
+        # when
+        order = self.checkout()
+
+        # then
+        document = OrderDocument.objects.get(order=order).document
+        self.assertEqual(
+            document["user"], {"id": self.user.id, "username": "test_user"}
+        )
+        self.assertEqual(document["total"], "25.98")
+        self.assertEqual(document["items"][0]["unit_price"], "12.99")
+
+    def test_customer_list_is_served_from_documents(self):
+        # given
+        order = self.checkout()
+        OrderDocument.objects.filter(order=order).update(document={"id": "cached"})
+
+        # when
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/orders/")
+
+        # then
+        self.assertEqual(response.data["results"], [{"id": "cached"}])
+        self.assertFalse(
+            any("LittleLemonAPI_orderitem" in query["sql"] for query in queries)
+        )
+
+    def test_order_detail_update_refreshes_document(self):
+        # given
+        order = self.checkout()
+        self.client.force_authenticate(self.manager)
+
+        # when
+        self.client.patch(
+            f"/api/orders/{order.id}",
+            {"delivery_crew": self.delivery_person.id},
+            content_type="application/json",
+        )
+
+        # then
+        self.client.force_authenticate(self.delivery_person)
+        response = self.client.get("/api/orders/")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            response.data["results"][0]["delivery_crew"], self.delivery_person.id
+        )
+
+    def test_order_detail_update_of_other_fields_refreshes_document(self):
+        # given
+        order = self.checkout()
+
+        # when
+        self.client.patch(
+            f"/api/orders/{order.id}",
+            {"date": "2024-02-01"},
+            content_type="application/json",
+        )
+
+        # then
+        response = self.client.get("/api/orders/")
+        self.assertEqual(response.data["results"][0]["date"], "2024-02-01")
+        self.assertEqual(
+            OrderDocument.objects.get(order=order).date, datetime.date(2024, 2, 1)
+        )
+
+    def test_check_order_documents(self):
+        # given
+        order = self.checkout()
+        Order.objects.filter(pk=order.pk).update(status=True)
+        out = StringIO()
+
+        # when
+        call_command("check_order_documents", stdout=out)
+        call_command("check_order_documents", "--fix", stdout=out)
+
+        # then
+        self.assertIn("Found 1 missing or stale order documents.", out.getvalue())
+        self.assertIn("Rewrote 1 order documents.", out.getvalue())
+        self.assertTrue(OrderDocument.objects.get(order=order).document["status"])
+
+
+class StockTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category, stock=3
+        )
+
+    def test_checkout_decrements_stock(self):
+        # given
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=2)
+
+        # when
+        response = self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # then
+        self.assertEqual(response.status_code, 201)
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.stock, 1)
+
+    def test_checkout_when_stock_ran_out_after_cart_add(self):
+        # given
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=2)
+        MenuItem.objects.filter(pk=self.pasta.pk).update(stock=1)
+
+        # when
+        response = self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # then
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(Cart.objects.filter(user=self.user).exists())
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.stock, 1)
+
+    def test_checkout_of_untracked_item(self):
+        # given
+        MenuItem.objects.filter(pk=self.pasta.pk).update(stock=None)
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=2)
+
+        # when
+        response = self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # then
+        self.assertEqual(response.status_code, 201)
+        self.pasta.refresh_from_db()
+        self.assertIsNone(self.pasta.stock)
+
+    def test_cart_add_rejects_sold_out_item(self):
+        # given
+        MenuItem.objects.filter(pk=self.pasta.pk).update(stock=0)
+
+        # when
+        response = self.client.post(
+            "/api/cart/menu-items/",
+            {"menuitem_id": self.pasta.id, "quantity": 1},
+            content_type="application/json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("menuitem_id", response.data)
+        self.assertFalse(Cart.objects.exists())
+
+    def test_menu_item_edit_keeps_concurrent_stock_change(self):
+        # given
+        manager = User.objects.create_user(username="manager", password="Password123!")
+        manager.groups.add(Group.objects.create(name="Manager"))
+        self.client.force_authenticate(manager)
+        item = MenuItem.objects.get(pk=self.pasta.pk)
+        MenuItem.objects.filter(pk=self.pasta.pk).update(stock=0)
+
+        # when
+        serializer = MenuItemSerializer(item, data={"title": "Penne"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        # then
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.title, "Penne")
+        self.assertEqual(self.pasta.stock, 0)
+
+    def test_checkout_changes_catalog_etag(self):
+        # given
+        self.addCleanup(cache.clear)
+        self.enterContext(self.settings(CATALOG_ETAGS=True))
+        etag = self.client.get("/api/menu-items/")["ETag"]
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=1)
+
+        # when
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/orders/", {}, content_type="application/json")
+        response = self.client.get("/api/menu-items/", HTTP_IF_NONE_MATCH=etag)
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["stock"], 2)
+
+    def test_order_deletion_restores_stock(self):
+        # given
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=2)
+        self.client.post("/api/orders/", {}, content_type="application/json")
+        manager = User.objects.create_user(username="manager", password="Password123!")
+        manager.groups.add(Group.objects.create(name="Manager"))
+        self.client.force_authenticate(manager)
+
+        # when
+        response = self.client.delete(f"/api/orders/{Order.objects.get().id}")
+
+        # then
+        self.assertEqual(response.status_code, 204)
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.stock, 3)
+
+
+class ConcurrentCheckoutTestCase(TransactionTestCase):
+    customers = 12
+    stock = 5
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            # Shared-cache in-memory SQLite fails concurrent writers instead of
+            # queueing them; run against a file or server database to exercise
+            # this (or use the bench_checkout command).
+            self.skipTest("needs a database that supports concurrent writers")
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta",
+            price=12.99,
+            featured=False,
+            category=category,
+            stock=self.stock,
+        )
+        self.users = [
+            User.objects.create_user(username=f"customer-{i}", password="Password123!")
+            for i in range(self.customers)
+        ]
+        for user in self.users:
+            Cart.objects.create(user=user, menuitem=self.pasta, quantity=1)
+
+    def checkout(self, user, barrier):
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            return client.post(
+                "/api/orders/", {}, content_type="application/json"
+            ).status_code
+        finally:
+            connection.close()
+
+    def test_concurrent_checkouts_do_not_oversell(self):
+        # given
+        barrier = threading.Barrier(self.customers)
+
+        # when
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.customers) as pool:
+            codes = list(pool.map(partial(self.checkout, barrier=barrier), self.users))
+        elapsed = time.perf_counter() - started
+
+        # then
+        self.assertEqual(codes.count(201), self.stock, codes)
+        self.assertEqual(codes.count(409), self.customers - self.stock, codes)
+        self.assertEqual(Order.objects.count(), self.stock)
+        self.pasta.refresh_from_db()
+        self.assertEqual(self.pasta.stock, 0)
+        self.assertLess(elapsed, 30)
+
+
+class OrderArchiveTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+        self.today = datetime.date.today()
+        self.old = self.create_order(self.today - datetime.timedelta(days=200), True)
+        self.open_old = self.create_order(
+            self.today - datetime.timedelta(days=200), False
+        )
+        self.recent = self.create_order(self.today, True)
+
+    def create_order(self, date, status):
+        order = Order.objects.create(
+            user=self.user, status=status, total=12.99, date=date
+        )
+        OrderItem.objects.create(order=order, menuitem=self.pasta, quantity=1)
+        refresh_order_documents([order.id])
+        return order
+
+    def archive(self):
+        call_command("archive_orders", "--older-than-days", "90", stdout=StringIO())
+
+    def test_archive_moves_old_delivered_orders(self):
+        # when
+        self.archive()
+
+        # then
+        self.assertEqual(
+            set(Order.objects.values_list("id", flat=True)),
+            {self.open_old.id, self.recent.id},
+        )
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual(archived.id, self.old.id)
+        self.assertEqual(archived.document["items"][0]["unit_price"], "12.99")
+        self.assertEqual(ArchivedOrderItem.objects.get().order_id, self.old.id)
+        self.assertFalse(OrderDocument.objects.filter(order_id=self.old.id).exists())
+
+    def test_list_without_date_filter_skips_archive(self):
+        # given
+        self.archive()
+
+        # when
+        response = self.client.get("/api/orders/")
+
+        # then
+        self.assertEqual(
+            [order["id"] for order in response.data["results"]],
+            [self.open_old.id, self.recent.id],
+        )
+
+    def test_list_with_date_filter_searches_archive(self):
+        # given
+        self.archive()
+        since = self.today - datetime.timedelta(days=365)
+
+        # when
+        response = self.client.get(
+            "/api/orders/", {"date__gte": since.isoformat(), "ordering": "-date"}
+        )
+
+        # then
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            [order["id"] for order in response.data["results"]],
+            [self.recent.id, self.old.id, self.open_old.id],
+        )
+
+    def test_list_archive_is_scoped_to_customer(self):
+        # given
+        self.archive()
+        other = User.objects.create_user(username="other", password="Password123!")
+        self.client.force_authenticate(other)
+
+        # when
+        response = self.client.get("/api/orders/", {"date": self.old.date.isoformat()})
+
+        # then
+        self.assertEqual(response.data["results"], [])
+
+    def test_detail_falls_back_to_archive(self):
+        # given
+        self.archive()
+
+        # when
+        response = self.client.get(f"/api/orders/{self.old.id}")
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], self.old.id)
+        self.assertEqual(self.client.get("/api/orders/999").status_code, 404)
+
+    def test_rebuild_sales_rollups_counts_archived_orders(self):
+        # given
+        self.archive()
+
+        # when
+        rebuild_sales_rollups()
+
+        # then
+        self.assertEqual(DailySales.objects.get(date=self.old.date).orders, 2)
+        self.assertEqual(DailyMenuItemSales.objects.get(date=self.old.date).quantity, 2)
+
+
+flaky_calls = []
+
+
+@job(name="tests.flaky", max_attempts=2)
+def flaky(fail_times):
+    flaky_calls.append(fail_times)
+    if len(flaky_calls) <= fail_times:
+        raise RuntimeError("temporary failure")
+
+
+@job(name="tests.outlived_lease")
+def outlived_lease():
+    DailySales.objects.create(date="2024-01-01", orders=1, revenue=10)
+    # Another worker claims the job after this run's lease expired.
+    Job.objects.filter(name="tests.outlived_lease").update(attempts=F("attempts") + 1)
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        flaky_calls.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def test_checkout_defers_sales_rollups_to_a_job(self):
+        # given
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=2)
+
+        # when
+        self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # then
+        self.assertFalse(DailySales.objects.exists())
+        self.assertEqual(
+            list(Job.objects.values_list("name", "state")),
+            [("analytics.record_order_sales", Job.QUEUED)],
+        )
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(DailySales.objects.get().revenue, Decimal("25.98"))
+        self.assertFalse(Job.objects.exists())
+
+    def test_enqueue_is_rolled_back_with_transaction(self):
+        # when
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            flaky.enqueue(fail_times=0)
+            raise RuntimeError
+
+        # then
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_retried_with_backoff(self):
+        # given
+        flaky.enqueue(fail_times=1)
+
+        # when
+        run_pending_jobs()
+
+        # then
+        job = Job.objects.get()
+        self.assertEqual((job.state, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("temporary failure", job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        # when
+        Job.objects.update(run_after=timezone.now())
+        run_pending_jobs()
+
+        # then
+        self.assertEqual(flaky_calls, [1, 1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_fails_after_max_attempts(self):
+        # given
+        flaky.enqueue(fail_times=5)
+
+        # when
+        for _ in range(2):
+            Job.objects.update(run_after=timezone.now())
+            run_pending_jobs()
+
+        # then
+        job = Job.objects.get()
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, 2))
+
+    def test_expired_lease_is_reclaimed(self):
+        # given
+        queued = flaky.enqueue(fail_times=0)
+        Job.objects.filter(pk=queued.pk).update(
+            state=Job.RUNNING,
+            attempts=1,
+            locked_until=timezone.now() - datetime.timedelta(seconds=1),
+        )
+
+        # when
+        ran = run_pending_jobs()
+
+        # then
+        self.assertEqual(ran, 1)
+        self.assertEqual(flaky_calls, [0])
+        self.assertFalse(execute_job(queued.pk))
+
+    def test_job_that_outlived_its_lease_is_rolled_back(self):
+        # given
+        outlived_lease.enqueue()
+
+        # when
+        ran = run_pending_jobs()
+
+        # then
+        self.assertEqual(ran, 1)
+        self.assertFalse(DailySales.objects.exists())
+        # The job is left to the worker that holds the lease now.
+        self.assertEqual(Job.objects.get().state, Job.RUNNING)
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((self.path, json.loads(body)))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubWebhookHandler)
+        self.server.requests, self.server.statuses, self.server.connections = [], [], 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hooks/orders"
+        self.webhooks = WebhookClient(timeout=5)
+        self.addCleanup(self.webhooks.close)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def checkout(self):
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=1)
+        self.client.post("/api/orders/", {}, content_type="application/json")
+
+    def dispatch(self, batch_size=None):
+        return dispatch_outbox(self.webhooks, batch_size)
+
+    def test_order_change_writes_outbox_in_transaction(self):
+        # when
+        with self.settings(ORDER_WEBHOOK_URLS=[self.url]):
+            self.checkout()
+
+        # then
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.endpoint, self.url)
+        self.assertEqual(event.event["type"], "order.created")
+
+    def test_dispatch_batches_over_one_connection(self):
+        # given
+        with self.settings(ORDER_WEBHOOK_URLS=[self.url]):
+            for _ in range(3):
+                self.checkout()
+
+        # when
+        delivered = self.dispatch(batch_size=2) + self.dispatch(batch_size=2)
+
+        # then
+        self.assertEqual(delivered, 3)
+        self.assertEqual(
+            [len(body["events"]) for _, body in self.server.requests], [2, 1]
+        )
+        self.assertEqual(self.server.requests[0][0], "/hooks/orders")
+        self.assertEqual(self.server.connections, 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_batch_backs_off_and_keeps_order(self):
+        # given
+        self.server.statuses = [503]
+        with self.settings(ORDER_WEBHOOK_URLS=[self.url]):
+            self.checkout()
+            self.checkout()
+        first, second = OutboxEvent.objects.order_by("id")
+
+        # when
+        with self.assertLogs("LittleLemonAPI.outbox", "WARNING"):
+            self.dispatch(batch_size=1)
+
+        # then
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(first.last_error, "HTTP 503 Service Unavailable")
+        self.assertGreater(first.next_attempt, timezone.now())
+        self.assertEqual(self.dispatch(), 0)
+
+        # when
+        OutboxEvent.objects.filter(pk=first.pk).update(next_attempt=timezone.now())
+        self.dispatch()
+
+        # then
+        self.assertEqual(
+            [event["id"] for event in self.server.requests[-1][1]["events"]],
+            [first.id, second.id],
+        )
+
+    def test_delivery_is_given_up_after_max_attempts(self):
+        # given
+        self.server.statuses = [500, 500]
+        with self.settings(ORDER_WEBHOOK_URLS=[self.url], OUTBOX_MAX_ATTEMPTS=2):
+            self.checkout()
+
+            # when
+            with self.assertLogs("LittleLemonAPI.outbox", "WARNING"):
+                self.dispatch()
+                OutboxEvent.objects.update(next_attempt=timezone.now())
+                self.dispatch()
+
+        # then
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNone(event.next_attempt)
+
+
+class OrderVersionTestCase(TestCase):
+    def setUp(self):
+        customer = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        self.manager = User.objects.create_user(
+            username="manager", password="Password123!"
+        )
+        self.manager.groups.add(Group.objects.create(name="Manager"))
+        self.delivery_person = User.objects.create_user(
+            username="delivery_person", password="Password123!"
+        )
+        self.delivery_person.groups.add(Group.objects.create(name="Delivery Crew"))
+        self.order = Order.objects.create(
+            user=customer,
+            delivery_crew=self.delivery_person,
+            total=9.99,
+            date="2024-01-01",
+        )
+        self.manager_client = APIClient()
+        self.manager_client.force_authenticate(self.manager)
+        self.crew_client = APIClient()
+        self.crew_client.force_authenticate(self.delivery_person)
+
+    def patch(self, client, data, **headers):
+        return client.patch(
+            f"/api/orders/{self.order.id}",
+            data,
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_get_returns_version_and_etag(self):
+        # when
+        response = self.crew_client.get(f"/api/orders/{self.order.id}")
+
+        # then
+        self.assertEqual(response.data["version"], 1)
+        self.assertEqual(response["ETag"], '"1"')
+
+    def test_concurrent_updates_conflict_then_retry(self):
+        # given
+        other = User.objects.create_user(username="other", password="Password123!")
+        other.groups.add(Group.objects.get(name="Delivery Crew"))
+        etag = self.crew_client.get(f"/api/orders/{self.order.id}")["ETag"]
+
+        # when
+        reassigned = self.patch(
+            self.manager_client, {"delivery_crew": other.id}, If_Match=etag
+        )
+        conflict = self.patch(self.crew_client, {"status": True}, If_Match=etag)
+        retried = self.patch(
+            self.crew_client, {"status": True}, If_Match=conflict["ETag"]
+        )
+
+        # then
+        self.assertEqual(reassigned.status_code, 200)
+        self.assertEqual(reassigned["ETag"], '"2"')
+        self.assertEqual(conflict.status_code, 409)
+        self.assertEqual(conflict.data["version"], 2)
+        self.assertEqual(retried.status_code, 200)
+        self.order.refresh_from_db()
+        self.assertEqual(
+            (self.order.delivery_crew_id, self.order.status, self.order.version),
+            (other.id, True, 3),
+        )
+
+    def test_update_without_if_match_is_conditional_on_read_version(self):
+        # given
+        get_object = OrderDetail.get_object
+
+        def get_object_then_concurrent_write(view):
+            order = get_object(view)
+            Order.objects.filter(pk=order.pk).update(
+                status=True, version=F("version") + 1
+            )
+            return order
+
+        # when
+        with mock.patch.object(
+            OrderDetail, "get_object", get_object_then_concurrent_write
+        ):
+            response = self.patch(
+                self.manager_client, {"delivery_crew": self.manager.id}
+            )
+
+        # then
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.delivery_crew_id, self.delivery_person.id)
+
+    def test_invalid_if_match(self):
+        # when
+        response = self.patch(self.crew_client, {"status": True}, If_Match='"abc"')
+
+        # then
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_update_bumps_version(self):
+        # when
+        self.manager_client.patch(
+            "/api/orders/bulk",
+            {"orders": [{"id": self.order.id, "status": True}]},
+            content_type="application/json",
+        )
+
+        # then
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.version, 2)
+
+
+class ConcurrentOrderUpdateTestCase(TransactionTestCase):
+    writers = 8
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("needs a database that supports concurrent writers")
+        customer = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        self.manager = User.objects.create_user(
+            username="manager", password="Password123!"
+        )
+        self.manager.groups.add(Group.objects.create(name="Manager"))
+        self.order = Order.objects.create(user=customer, total=9.99, date="2024-01-01")
+
+    def update(self, status, barrier):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        barrier.wait()
+        try:
+            return client.patch(
+                f"/api/orders/{self.order.id}",
+                {"status": status},
+                content_type="application/json",
+                headers={"If-Match": '"1"'},
+            ).status_code
+        finally:
+            connection.close()
+
+    def test_only_one_writer_wins_a_version(self):
+        # given
+        barrier = threading.Barrier(self.writers)
+
+        # when
+        with ThreadPoolExecutor(max_workers=self.writers) as pool:
+            codes = list(
+                pool.map(
+                    partial(self.update, barrier=barrier),
+                    [bool(i % 2) for i in range(self.writers)],
+                )
+            )
+
+        # then
+        self.assertEqual(codes.count(200), 1, codes)
+        self.assertEqual(codes.count(409), self.writers - 1, codes)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.version, 2)
+
+
+class CacheCartStorageTestCase(TestCase):
+    def setUp(self):
+        self.enterContext(
+            self.settings(CART_STORAGE="LittleLemonAPI.cart_storage.CacheCartStorage")
+        )
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="test_user", email="test_user@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def add(self, menuitem, quantity):
+        return self.client.post(
+            "/api/cart/menu-items/",
+            {"menuitem_id": menuitem.id, "quantity": quantity},
+            content_type="application/json",
+        )
+
+    def test_cart_edits_stay_in_the_cache(self):
+        # when
+        response = self.add(self.pasta, 2)
+
+        # then
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["price"], "25.98")
+        self.assertFalse(Cart.objects.exists())
+        listed = self.client.get("/api/cart/menu-items/").data["results"]
+        self.assertEqual([item["menuitem"]["id"] for item in listed], [self.pasta.id])
+
+    def test_adding_an_item_twice(self):
+        # given
+        self.add(self.pasta, 2)
+
+        # when
+        response = self.add(self.pasta, 1)
+
+        # then
+        self.assertEqual(response.status_code, 400)
+
+    def test_checkout_flushes_the_cart(self):
+        # given
+        self.add(self.pasta, 2)
+
+        # when
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/orders/", {}, content_type="application/json"
+            )
+
+        # then
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get(user=self.user).total, Decimal("25.98"))
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.client.get("/api/cart/menu-items/").data["count"], 0)
+
+    def test_flush_carts_between_checkout_commit_and_eviction(self):
+        # given
+        self.add(self.pasta, 2)
+
+        # when
+        # The checkout has committed, but its eviction has not run yet.
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post("/api/orders/", {}, content_type="application/json")
+        self.call_flush_carts()
+        for callback in callbacks:
+            callback()
+
+        # then
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(self.client.get("/api/cart/menu-items/").data["count"], 0)
+
+    def test_flush_carts_writes_changed_carts(self):
+        # given
+        self.add(self.pasta, 2)
+
+        # when
+        output = self.call_flush_carts()
+
+        # then
+        self.assertIn("Flushed 1 carts.", output)
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual((cart.menuitem_id, cart.quantity), (self.pasta.id, 2))
+        self.assertIn("Flushed 0 carts.", self.call_flush_carts())
+
+    def call_flush_carts(self):
+        out = StringIO()
+        call_command("flush_carts", stdout=out)
+        return out.getvalue()
+
+
+class CartExpiryTestCase(TestCase):
+    def setUp(self):
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+        self.soup = MenuItem.objects.create(
+            title="Soup", price=5.99, featured=False, category=category
+        )
+        self.long_ago = timezone.now() - datetime.timedelta(days=30)
+
+    def cart(self, username, *menuitems):
+        user = User.objects.create_user(username=username, password="Password123!")
+        for menuitem in menuitems:
+            Cart.objects.create(user=user, menuitem=menuitem, quantity=1)
+        return user
+
+    def test_cart_timestamps(self):
+        # given
+        user = self.cart("customer", self.pasta)
+        cart = Cart.objects.get(user=user)
+
+        # when
+        cart.quantity = 2
+        cart.save()
+
+        # then
+        self.assertIsNotNone(cart.created)
+        self.assertGreater(cart.updated, cart.created)
+
+    def test_expire_abandoned_carts_in_batches(self):
+        # given
+        abandoned = [
+            self.cart(f"abandoned-{i}", self.pasta, self.soup) for i in range(3)
+        ]
+        active = self.cart("active", self.pasta, self.soup)
+        Cart.objects.exclude(user=active, menuitem=self.soup).update(
+            updated=self.long_ago
+        )
+        out = StringIO()
+
+        # when
+        with CaptureQueriesContext(connection) as queries:
+            call_command("expire_carts", batch_size=2, stdout=out)
+
+        # then
+        self.assertIn("Deleted 6 expired cart items.", out.getvalue())
+        self.assertFalse(Cart.objects.filter(user__in=abandoned).exists())
+        self.assertEqual(Cart.objects.filter(user=active).count(), 2)
+        deletes = [q for q in queries if q["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 2)
+
+    def test_expire_keeps_cart_touched_after_lookup_whole(self):
+        # given
+        user = self.cart("customer", self.pasta)
+        Cart.objects.update(updated=self.long_ago)
+        atomic = transaction.atomic
+        touched = []
+
+        def add_item_first(*args, **kwargs):
+            # The customer adds an item between the lookup and the delete.
+            if not touched:
+                touched.append(True)
+                Cart.objects.create(user=user, menuitem=self.soup, quantity=1)
+            return atomic(*args, **kwargs)
+
+        # when
+        with mock.patch.object(transaction, "atomic", add_item_first):
+            expired = expire_carts()
+
+        # then
+        self.assertEqual(expired, 0)
+        self.assertEqual(Cart.objects.filter(user=user).count(), 2)
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(self.settings(PROFILE_DIR=directory.name, PROFILE_KEEP=2))
+        self.directory = Path(directory.name)
+        admin = User.objects.create_superuser(username="admin", password="Password123!")
+        customer = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        self.admin_token = Token.objects.create(user=admin)
+        self.customer_token = Token.objects.create(user=customer)
+
+    def get(self, token, **headers):
+        return self.client.get(
+            "/api/menu-items/",
+            headers={"Authorization": f"Token {token}", **headers},
+        )
+
+    def test_superuser_profiles_a_request(self):
+        # when
+        response = self.get(self.admin_token, **{"X-Profile": "1"})
+
+        # then
+        profile_id = response["X-Profile-Id"]
+        meta = json.loads((self.directory / f"{profile_id}.json").read_text())
+        self.assertEqual(meta["path"], "/api/menu-items/")
+        self.assertEqual(meta["status"], 200)
+        self.assertTrue(meta["queries"])
+        self.assertTrue((self.directory / f"{profile_id}.prof").exists())
+
+    def test_overlapping_request_is_not_profiled(self):
+        # given
+        profiling.acquire()
+        self.addCleanup(profiling.release)
+
+        # when
+        response = self.get(self.admin_token, **{"X-Profile": "1"})
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+
+    def test_other_users_cannot_profile(self):
+        # when
+        response = self.get(self.customer_token, **{"X-Profile": "1"})
+
+        # then
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(self.directory.exists() and any(self.directory.iterdir()))
+
+    def test_sampling_keeps_the_newest_profiles(self):
+        # given
+        with self.settings(PROFILE_SAMPLE_RATE=1.0):
+            ids = [self.get(self.customer_token)["X-Profile-Id"] for _ in range(3)]
+        out = StringIO()
+
+        # when
+        call_command("summarize_profiles", stdout=out)
+
+        # then
+        self.assertEqual(
+            sorted(path.stem for path in self.directory.glob("*.prof")), ids[1:]
+        )
+        self.assertIn("2 requests", out.getvalue())
+        self.assertIn("views.py", out.getvalue())
+        self.assertIn('FROM "LittleLemonAPI_menuitem"', out.getvalue())
+
+
+class SlowQueryLogTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = Path(directory.name) / "slow.log"
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="customer", password="Password123!")
+        )
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def test_normalize_sql(self):
+        # when
+        normalized = normalize_sql(
+            "SELECT * FROM t WHERE a = 'it''s' AND b IN (%s, %s) AND c > 1.5"
+        )
+
+        # then
+        self.assertEqual(
+            normalized, "SELECT * FROM t WHERE a = ? AND b IN (...) AND c > ?"
+        )
+
+    def test_slow_queries_are_logged_with_view_and_plan(self):
+        # when
+        with (
+            self.settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG=self.log),
+            self.assertLogs("LittleLemonAPI.slow_queries"),
+        ):
+            self.client.get("/api/menu-items/")
+
+        # then
+        entries = [json.loads(line) for line in self.log.read_text().splitlines()]
+        menu_query = next(e for e in entries if "LittleLemonAPI_menuitem" in e["sql"])
+        self.assertEqual(menu_query["view"], "LittleLemonAPI.views.MenuItemList")
+        self.assertIn("SCAN", menu_query["plan"])
+
+    def test_unwritable_log_does_not_fail_the_request(self):
+        # when
+        with (
+            self.settings(
+                SLOW_QUERY_THRESHOLD=0,
+                SLOW_QUERY_LOG=self.log.parent / "missing" / "log",
+            ),
+            self.assertLogs("LittleLemonAPI.slow_queries", "ERROR"),
+        ):
+            response = self.client.get("/api/menu-items/")
+
+        # then
+        self.assertEqual(response.status_code, 200)
+
+    def test_threshold_can_be_disabled_at_runtime(self):
+        # when
+        with self.settings(SLOW_QUERY_THRESHOLD=None, SLOW_QUERY_LOG=self.log):
+            response = self.client.get("/api/menu-items/")
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.log.exists())
+
+    def test_report_aggregates_by_fingerprint(self):
+        # given
+        with (
+            self.settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG=self.log),
+            self.assertLogs("LittleLemonAPI.slow_queries"),
+        ):
+            self.client.get("/api/menu-items/?page_size=10")
+            self.client.get("/api/menu-items/?page_size=20")
+        out = StringIO()
+
+        # when
+        with self.settings(SLOW_QUERY_LOG=self.log):
+            call_command(
+                "slow_query_report",
+                view="LittleLemonAPI.views.MenuItemList",
+                stdout=out,
+            )
+
+        # then
+        self.assertIn("2 slow", out.getvalue())
+        self.assertIn("LittleLemonAPI.views.MenuItemList (2)", out.getvalue())
+        self.assertIn("plan: ", out.getvalue())
+
+
+class RequestCoalescingTestCase(TestCase):
+    herd = 20
+    url = "/api/menu-items/?featured=false&ordering=price"
+
+    def setUp(self):
+        # The herd would otherwise use up the user's throttle for later tests.
+        self.addCleanup(cache.clear)
+        # Admit the whole herd past the concurrency limiter.
+        reset_limit()
+        self.addCleanup(reset_limit)
+        self.enterContext(self.settings(CONCURRENCY_LIMIT_INITIAL=self.herd * 2))
+        self.user = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        for i in range(5):
+            MenuItem.objects.create(
+                title=f"Dish {i}", price=10 + i, featured=False, category=category
+            )
+
+    def get(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(self.url)
+
+    def follow(self, results):
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get()
+            results.append((response.json(), len(queries)))
+        finally:
+            connection.close()
+
+    def test_thundering_herd_shares_one_computation(self):
+        # given
+        with CaptureQueriesContext(connection) as alone:
+            expected = self.get().json()
+        results = []
+        followers = [
+            threading.Thread(target=self.follow, args=(results,))
+            for _ in range(self.herd)
+        ]
+        list_view = MenuItemList.list
+
+        def list_once_the_herd_waits(view, request, *args, **kwargs):
+            for follower in followers:
+                follower.start()
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and self.herd > sum(
+                flight.followers for flight in single_flight.flights.values()
+            ):
+                time.sleep(0.001)
+            return list_view(view, request, *args, **kwargs)
+
+        # when
+        with (
+            mock.patch.object(
+                MenuItemList,
+                "list",
+                autospec=True,
+                side_effect=list_once_the_herd_waits,
+            ) as listed,
+            CaptureQueriesContext(connection) as leader,
+        ):
+            response = self.get()
+            for follower in followers:
+                follower.join()
+
+        # then
+        self.assertEqual(listed.call_count, 1)
+        self.assertEqual(response.json(), expected)
+        self.assertEqual([body for body, _ in results], [expected] * self.herd)
+        # Only the leader queried the database: the herd saved
+        # herd * len(alone) queries.
+        self.assertEqual(len(leader), len(alone))
+        self.assertEqual([count for _, count in results], [0] * self.herd)
+
+    def test_catalog_bump_is_not_served_older_data(self):
+        # when
+        with mock.patch.object(single_flight, "do", wraps=single_flight.do) as do:
+            self.get()
+            bump_catalog_version()
+            self.get()
+
+        # then
+        before, after = (call.args[0] for call in do.call_args_list)
+        self.assertNotEqual(before, after)
+
+    def test_leader_errors_reach_followers(self):
+        # given
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise ValueError("boom")
+
+        pool = ThreadPoolExecutor(2)
+        self.addCleanup(pool.shutdown)
+        leader = pool.submit(flights.do, "key", fail)
+        started.wait(5)
+        follower = pool.submit(flights.do, "key", lambda: "fresh")
+        while not flights.flights["key"].followers:
+            time.sleep(0.001)
+
+        # when
+        release.set()
+
+        # then
+        for future in (leader, follower):
+            with self.assertRaisesMessage(ValueError, "boom"):
+                future.result(5)
+        self.assertEqual(flights.do("key", lambda: "fresh"), "fresh")
+
+
+class LoadSheddingTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_limit)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=False, category=category
+        )
+
+    def test_reads_over_the_limit_are_shed(self):
+        # given
+        limit = get_limit()
+        limit.in_flight = int(limit.limit * 0.8)
+
+        # when
+        response = self.client.get("/api/menu-items/")
+
+        # then
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_checkouts_use_the_reserve_and_crowd_out_reads(self):
+        # given
+        limit = get_limit()
+        for _ in range(int(limit.limit * 0.8)):
+            # Checkouts queueing on the write lock.
+            limit.acquire(force=True)
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=1)
+
+        # when
+        read = self.client.get("/api/menu-items/")
+        checkout = self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # then
+        self.assertEqual(read.status_code, 503)
+        self.assertEqual(checkout.status_code, 201)
+
+    def test_checkout_is_never_shed(self):
+        # given
+        limit = get_limit()
+        limit.in_flight = int(limit.limit)
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=1)
+
+        # when
+        response = self.client.post("/api/orders/", {}, content_type="application/json")
+
+        # then
+        self.assertEqual(response.status_code, 201)
+
+    def test_limit_adapts_to_latency(self):
+        # given
+        limit = ConcurrencyLimit()
+        initial = limit.limit
+
+        # when
+        for _ in range(10):
+            limit.acquire()
+            limit.release("GET /api/menu-items/", 0.01)
+        grown = limit.limit
+        for _ in range(10):
+            limit.acquire()
+            limit.release("GET /api/menu-items/", 0.5)
+
+        # then
+        self.assertGreater(grown, initial)
+        self.assertLess(limit.limit, grown * 0.5)
+        self.assertEqual(limit.in_flight, 0)
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.pasta = MenuItem.objects.create(
+            title="Pasta", price=12.99, featured=True, category=category
+        )
+
+    def batch(self, *entries, **options):
+        return self.client.post(
+            "/api/batch",
+            {"requests": list(entries), **options},
+            content_type="application/json",
+        )
+
+    def test_screen_loads_in_one_round_trip(self):
+        # given
+        paths = [
+            "/api/categories/",
+            "/api/menu-items/?featured=true",
+            "/api/cart/menu-items/",
+            "/api/orders/",
+        ]
+        expected = [self.client.get(path).json() for path in paths]
+
+        # when
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch(*({"method": "GET", "path": path} for path in paths))
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["responses"]
+        self.assertEqual([result["status"] for result in results], [200] * 4)
+        self.assertEqual([result["body"] for result in results], expected)
+        token_lookups = [q for q in queries if "authtoken_token" in q["sql"]]
+        self.assertEqual(len(token_lookups), 1)
+
+    def test_entries_are_admitted_one_by_one(self):
+        # given
+        self.addCleanup(reset_limit)
+        limit = get_limit()
+        limit.in_flight = int(limit.limit * 0.8)
+        Cart.objects.create(user=self.user, menuitem=self.pasta, quantity=1)
+
+        # when
+        response = self.batch(
+            {"method": "GET", "path": "/api/menu-items/"},
+            {"method": "POST", "path": "/api/orders/"},
+        )
+
+        # then
+        self.assertEqual(response.status_code, 200)
+        read, checkout = response.json()["responses"]
+        self.assertEqual(read["status"], 503)
+        self.assertEqual(read["headers"]["Retry-After"], "1")
+        self.assertEqual(checkout["status"], 201)
+
+    def test_entries_run_in_order(self):
+        # when
+        response = self.batch(
+            {
+                "method": "POST",
+                "path": "/api/cart/menu-items/",
+                "body": {"menuitem_id": self.pasta.id, "quantity": 2},
+            },
+            {"method": "GET", "path": "/api/cart/menu-items/"},
+            {"method": "GET", "path": "/api/menu-items/999"},
+            {"method": "GET", "path": "/api/nowhere"},
+        )
+
+        # then
+        results = response.json()["responses"]
+        self.assertEqual([result["status"] for result in results], [201, 200, 404, 404])
+        self.assertEqual(results[1]["body"]["count"], 1)
+
+    def test_rejects_nested_and_oversized_batches(self):
+        # when
+        nested = self.batch({"method": "POST", "path": "/api/batch"})
+        with self.settings(BATCH_MAX_REQUESTS=2):
+            oversized = self.batch(*[{"method": "GET", "path": "/api/orders/"}] * 3)
+
+        # then
+        self.assertEqual(nested.status_code, 400)
+        self.assertEqual(oversized.status_code, 400)
+
+    def test_requires_authentication(self):
+        # when
+        response = APIClient().post(
+            "/api/batch",
+            {"requests": [{"method": "GET", "path": "/api/orders/"}]},
+            format="json",
+        )
+
+        # then
+        self.assertEqual(response.status_code, 401)
+
+
+class ParallelBatchTestCase(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(cache.clear)
+        # Start from a fresh concurrency limit, since each entry is admitted.
+        reset_limit()
+        self.addCleanup(reset_limit)
+        self.user = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        for i in range(3):
+            MenuItem.objects.create(
+                title=f"Dish {i}", price=10, featured=False, category=category
+            )
+
+    def test_parallel_reads(self):
+        # given
+        client = APIClient()
+        client.force_authenticate(self.user)
+        paths = [f"/api/menu-items/?page_size={size}" for size in (1, 2, 3)]
+
+        # when
+        response = client.post(
+            "/api/batch",
+            {
+                "requests": [{"method": "GET", "path": path} for path in paths],
+                "parallel": True,
+            },
+            format="json",
+        )
+
+        # then
+        results = response.json()["responses"]
+        self.assertEqual(
+            [len(result["body"]["results"]) for result in results], [1, 2, 3]
+        )
+
+
+# settings_api.py leaves the admin out.
+@skipUnless(apps.is_installed("django.contrib.admin"), "The admin is not installed.")
+class AdminTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser(username="admin", password="Password123!")
+        )
+        self.customer = User.objects.create_user(
+            username="customer", password="Password123!"
+        )
+        category = Category.objects.create(slug="main-course", title="Main Course")
+        self.items = [
+            MenuItem.objects.create(
+                title=f"Dish {i}", price=10, featured=False, category=category
+            )
+            for i in range(5)
+        ]
+
+    def create_order(self, lines):
+        order = Order.objects.create(user=self.customer, total=10, date="2024-01-01")
+        for menuitem in self.items[:lines]:
+            OrderItem.objects.create(order=order, menuitem=menuitem, quantity=1)
+        return order
+
+    def queries_for(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query["sql"] for query in queries]
+
+    def test_changelists_do_not_grow_with_the_table(self):
+        for model in ["order", "orderitem", "cart", "menuitem"]:
+            url = f"/admin/LittleLemonAPI/{model}/"
+            with self.subTest(model):
+                # given
+                self.create_order(lines=2)
+                Cart.objects.get_or_create(
+                    user=self.customer, menuitem=self.items[0], quantity=1
+                )
+                before = self.queries_for(url)
+                for _ in range(5):
+                    self.create_order(lines=2)
+
+                # when
+                after = self.queries_for(url)
+
+                # then
+                self.assertEqual(len(after), len(before))
+
+    def test_order_counts_are_capped(self):
+        # given
+        self.create_order(lines=1)
+
+        # when
+        queries = self.queries_for("/admin/LittleLemonAPI/order/")
+
+        # then
+        counts = [sql for sql in queries if "COUNT(" in sql]
+        self.assertTrue(counts)
+        for sql in counts:
+            self.assertIn("LIMIT", sql)
+
+    def test_order_page_loads_items_in_one_query(self):
+        # given
+        small = self.create_order(lines=1)
+        large = self.create_order(lines=5)
+        # Warm the content type cache.
+        self.queries_for(f"/admin/LittleLemonAPI/order/{small.id}/change/")
+
+        # when
+        small_queries = self.queries_for(
+            f"/admin/LittleLemonAPI/order/{small.id}/change/"
+        )
+        large_queries = self.queries_for(
+            f"/admin/LittleLemonAPI/order/{large.id}/change/"
+        )
+
+        # then
+        self.assertEqual(len(large_queries), len(small_queries))
+
+
+class WarmUpTestCase(TestCase):
+    def setUp(self):
+        Group.objects.create(name="Manager")
+        Group.objects.create(name="Delivery Crew")
+        category = Category.objects.create(slug="mains", title="Mains")
+        MenuItem.objects.create(
+            title="Pasta", price=Decimal("9.99"), featured=True, category=category
+        )
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_warm_up_loads_group_ids_and_serves_paths(self):
+        # when
+        timings = warm_up()
+
+        # then
+        self.assertEqual(
+            list(timings), ["urls", "group_ids", "catalog_version", "requests"]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            get_group_id("Manager")
+            get_group_id("Delivery Crew")
+        self.assertEqual(len(queries), 0)
+
+    def test_app_config_warms_up_only_when_enabled(self):
+        config = apps.get_app_config("LittleLemonAPI")
+        with (
+            mock.patch("LittleLemonAPI.warmup.warm_up") as warm_up_mock,
+            # Keep the test database connection open.
+            mock.patch.object(connections, "close_all"),
+        ):
+            # when
+            with self.settings(WARMUP_ON_START=False):
+                config.warm_up()
+
+            # then
+            warm_up_mock.assert_not_called()
+
+            # when
+            with self.settings(WARMUP_ON_START=True):
+                config.warm_up()
+
+            # then
+            warm_up_mock.assert_called_once()
+
+    def test_failing_step_does_not_stop_warm_up(self):
+        # given
+        self.enterContext(self.settings(WARMUP_PATHS=["/api/menu-items/"]))
+
+        # when
+        with (
+            mock.patch(
+                "LittleLemonAPI.warmup.get_catalog_version",
+                side_effect=ConnectionError("cache is down"),
+            ),
+            self.assertLogs("LittleLemonAPI.warmup", "ERROR"),
+        ):
+            timings = warm_up()
+
+        # then
+        self.assertEqual(list(timings), ["urls", "group_ids", "requests"])
+
+    def test_warmup_command(self):
+        # given
+        out = StringIO()
+
+        # when
+        call_command("warmup", stdout=out)
+
+        # then
+        self.assertIn("group_ids:", out.getvalue())
+        self.assertIn("requests:", out.getvalue())
@@ -7,11 +7,21 @@ urlpatterns = [
     path("categories/<int:pk>", views.CategoryDetail.as_view()),
     path("menu-items/", views.MenuItemList.as_view()),
     path("menu-items/<int:pk>", views.MenuItemDetail.as_view()),
+    path("menu-items/bulk", views.MenuItemBulkImport.as_view()),
+    path("menu-items/best-sellers", views.BestSellers.as_view()),
     path("groups/manager/users/", views.ManagerList.as_view()),
     path("groups/manager/users/<int:pk>", views.RemoveManager.as_view()),
+    path("groups/manager/users/bulk", views.ManagerBulk.as_view()),
     path("groups/delivery-crew/users/", views.DeliveryCrewList.as_view()),
     path("groups/delivery-crew/users/<int:pk>", views.RemoveDeliveryCrew.as_view()),
+    path("groups/delivery-crew/users/bulk", views.DeliveryCrewBulk.as_view()),
     path("cart/menu-items/", views.CartListCreateDelete.as_view()),
     path("orders/", views.OrderList.as_view()),
     path("orders/<int:pk>", views.OrderDetail.as_view()),
+    path("orders/bulk", views.OrderBulkUpdate.as_view()),
+    path("orders/events", views.order_event_stream),
+    path("analytics/sales/daily", views.DailySalesList.as_view()),
+    path("analytics/sales/menu-items", views.MenuItemSalesList.as_view()),
+    path("analytics/sales/categories", views.CategorySalesList.as_view()),
+    path("batch", views.Batch.as_view()),
 ]
@@ -1,58 +1,296 @@
+import asyncio
 import datetime
-
+import json
+import operator
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, reduce
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import Group, User
 from django.db import transaction
-from rest_framework import generics, status
+from django.db.models import F, Q, Sum
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import exceptions, generics, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .helpers import is_delivery_crew, is_manager
-from .models import Cart, Category, MenuItem, Order, OrderItem
+from .analytics import order_lines
+from .archive import archive_watermark
+from .assignment import adjust_crew_loads, crew_load_delta
+from .batch import run_subrequest, run_subrequest_in_thread
+from .cart_storage import get_cart_storage
+from .coalescing import CoalescedGetMixin
+from .documents import document_orders, refresh_order_documents
+from .events import broker, order_events, publish_events
+from .helpers import (
+    bump_catalog_version,
+    get_catalog_version,
+    get_group_id,
+    is_delivery_crew,
+    is_manager,
+)
+from .idempotency import idempotent
+from .jobs import assign_orders, enqueue_order_sales
+from .models import (
+    ArchivedOrder,
+    Cart,
+    Category,
+    DailyMenuItemSales,
+    DailySales,
+    MenuItem,
+    Order,
+    OrderDocument,
+    OrderItem,
+)
+from .parsers import CSVParser, parse_csv
 from .permissions import (
     ManagerAllCustomerAndDeliveryCrewReadOnly,
     ManagerOnly,
+    OrderBulkUpdatePermission,
     OrderDetailPermission,
     OrderListPermission,
 )
 from .serializers import (
+    BatchSerializer,
+    BestSellerSerializer,
+    BestSellersQuerySerializer,
     CartSerializer,
+    CategorySalesSerializer,
     CategorySerializer,
+    DailySalesSerializer,
+    MenuItemSalesSerializer,
     MenuItemSerializer,
+    OrderBulkUpdateSerializer,
+    OrderDocumentSerializer,
     OrderSerializer,
     OrderSerializerForDeliveryCrew,
     OrderSerializerForManager,
     ReadOnlyUserIdSerializer,
+    SalesRangeSerializer,
+    UserIdListSerializer,
     UserIdSerializer,
 )
 
 
-class CategoryList(generics.ListCreateAPIView):
+class CatalogVersionMixin:
+    def get(self, request, *args, **kwargs):
+        if not settings.CATALOG_ETAGS or not self.is_catalog_only(request):
+            return super().get(request, *args, **kwargs)
+        etag = f'W/"catalog-{get_catalog_version()}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+    def is_catalog_only(self, request):
+        return True
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        transaction.on_commit(bump_catalog_version)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        transaction.on_commit(bump_catalog_version)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        transaction.on_commit(bump_catalog_version)
+
+
+class IdempotentPostMixin:
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+
+class CategoryList(
+    IdempotentPostMixin, CatalogVersionMixin, generics.ListCreateAPIView
+):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [ManagerAllCustomerAndDeliveryCrewReadOnly]
 
 
-class CategoryDetail(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetail(CatalogVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [ManagerAllCustomerAndDeliveryCrewReadOnly]
 
 
-class MenuItemList(generics.ListCreateAPIView):
+class MenuItemList(
+    IdempotentPostMixin,
+    CatalogVersionMixin,
+    CoalescedGetMixin,
+    generics.ListCreateAPIView,
+):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
     permission_classes = [ManagerAllCustomerAndDeliveryCrewReadOnly]
     filterset_fields = ["featured", "category"]
     search_fields = ["title"]
-    ordering_fields = ["price"]
+    ordering_fields = ["price", "popularity"]
+
+    def is_catalog_only(self, request):
+        # Popularity changes with every checkout, not with the catalog version.
+        return "popularity" not in request.query_params.get("ordering", "")
 
+    def coalesce_scope(self, request):
+        # A request tagged with a newer catalog version must not be served the
+        # data of a computation that started before the bump.
+        return get_catalog_version()
 
-class MenuItemDetail(generics.RetrieveUpdateDestroyAPIView):
+
+class MenuItemDetail(CatalogVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = MenuItem.objects.all()
     serializer_class = MenuItemSerializer
     permission_classes = [ManagerAllCustomerAndDeliveryCrewReadOnly]
 
 
+class BestSellers(generics.GenericAPIView):
+    serializer_class = BestSellerSerializer
+    permission_classes = [ManagerAllCustomerAndDeliveryCrewReadOnly]
+
+    def get(self, request, *args, **kwargs):
+        query = BestSellersQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        days, limit = query.validated_data.get("days"), query.validated_data["limit"]
+
+        if days is None:
+            items = list(
+                MenuItem.objects.select_related("category")
+                .annotate(sold=F("popularity"))
+                .order_by("-popularity", "id")[:limit]
+            )
+        else:
+            since = timezone.localdate() - datetime.timedelta(days=days - 1)
+            sold = (
+                DailyMenuItemSales.objects.filter(date__gte=since)
+                .values_list("menuitem")
+                .annotate(units=Sum("quantity"))
+                .filter(units__gt=0)
+                .order_by("-units", "menuitem")[:limit]
+            )
+            sold = dict(sold)
+            items = MenuItem.objects.select_related("category").in_bulk(sold)
+            items = [items[menuitem_id] for menuitem_id in sold]
+            for item in items:
+                item.sold = sold[item.id]
+
+        return Response(self.get_serializer(items, many=True).data)
+
+
+class MenuItemBulkImport(generics.GenericAPIView):
+    serializer_class = MenuItemSerializer
+    permission_classes = [ManagerOnly]
+    parser_classes = [JSONParser, CSVParser, MultiPartParser]
+    batch_size = 500
+    max_rows = 5000
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        rows = self.get_rows(request)
+        if len(rows) > self.max_rows:
+            raise ValidationError(f"At most {self.max_rows} rows per import.")
+
+        errors = []
+        validated = []
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors.append({"row": index, "errors": ["Expected an object."]})
+                continue
+            item_id = row.get("id")
+            if item_id is not None and not str(item_id).isdigit():
+                errors.append({"row": index, "errors": {"id": ["Invalid id."]}})
+                continue
+            serializer = self.get_serializer(data=row, partial=item_id is not None)
+            if not serializer.is_valid():
+                errors.append({"row": index, "errors": serializer.errors})
+                continue
+            item_id = int(item_id) if item_id is not None else None
+            validated.append((index, item_id, serializer.validated_data))
+
+        category_ids = {
+            data["category_id"] for _, _, data in validated if "category_id" in data
+        }
+        known_categories = set(
+            Category.objects.filter(id__in=category_ids).values_list("id", flat=True)
+        )
+        existing = MenuItem.objects.in_bulk(
+            [item_id for _, item_id, _ in validated if item_id is not None]
+        )
+
+        new_items, changed_items = [], []
+        restocked = set()
+        for index, item_id, data in validated:
+            if "category_id" in data and data["category_id"] not in known_categories:
+                errors.append(
+                    {"row": index, "errors": {"category_id": ["Category not found."]}}
+                )
+            elif item_id is None:
+                new_items.append(MenuItem(**data))
+            elif item_id not in existing:
+                errors.append(
+                    {"row": index, "errors": {"id": ["Menu item not found."]}}
+                )
+            else:
+                item = existing[item_id]
+                for field, value in data.items():
+                    setattr(item, field, value)
+                changed_items.append(item)
+                if "stock" in data:
+                    restocked.add(item_id)
+
+        if errors:
+            errors.sort(key=lambda error: error["row"])
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            MenuItem.objects.bulk_create(new_items, batch_size=self.batch_size)
+            MenuItem.objects.bulk_update(
+                changed_items,
+                ["title", "price", "featured", "category_id"],
+                batch_size=self.batch_size,
+            )
+            MenuItem.objects.bulk_update(
+                [item for item in changed_items if item.pk in restocked],
+                ["stock"],
+                batch_size=self.batch_size,
+            )
+            if new_items or changed_items:
+                transaction.on_commit(bump_catalog_version)
+
+        return Response(
+            {"created": len(new_items), "updated": len(changed_items)},
+            status=status.HTTP_200_OK,
+        )
+
+    def get_rows(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            rows = request.data
+        elif upload.name.lower().endswith(".csv"):
+            rows = parse_csv(upload)
+        else:
+            rows = JSONParser().parse(upload)
+        if isinstance(rows, dict):
+            rows = rows.get("items")
+        if not isinstance(rows, list):
+            raise ValidationError("Expected a list of menu items.")
+        return rows
+
+
 class GroupMemberList(generics.ListCreateAPIView):
     group_name = None
     serializer_class = UserIdSerializer
@@ -61,7 +299,7 @@ class GroupMemberList(generics.ListCreateAPIView):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        group = Group.objects.get(name=self.group_name)
+        group = Group(id=get_group_id(self.group_name))
         group.user_set.add(serializer.data["id"])
         return Response(status=status.HTTP_201_CREATED)
 
@@ -76,7 +314,7 @@ class RemoveGroupMember(generics.RetrieveDestroyAPIView):
 
     def destroy(self, request, *args, **kwargs):
         user = self.get_object()
-        group = Group.objects.get(name=self.group_name)
+        group = Group(id=get_group_id(self.group_name))
         group.user_set.remove(user)
         return Response(status=status.HTTP_200_OK)
 
@@ -84,6 +322,40 @@ class RemoveGroupMember(generics.RetrieveDestroyAPIView):
         return User.objects.filter(groups__name=self.group_name)
 
 
+class GroupMemberBulk(generics.GenericAPIView):
+    group_name = None
+    serializer_class = UserIdListSerializer
+    permission_classes = [ManagerOnly]
+
+    def post(self, request, *args, **kwargs):
+        user_ids = self.get_user_ids(request)
+        group_id = get_group_id(self.group_name)
+        Membership = User.groups.through
+        Membership.objects.bulk_create(
+            [Membership(user_id=user_id, group_id=group_id) for user_id in user_ids],
+            ignore_conflicts=True,
+        )
+        return Response({"ids": user_ids}, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, *args, **kwargs):
+        user_ids = self.get_user_ids(request)
+        group_id = get_group_id(self.group_name)
+        removed, _ = User.groups.through.objects.filter(
+            group_id=group_id, user_id__in=user_ids
+        ).delete()
+        return Response({"ids": user_ids, "removed": removed})
+
+    def get_user_ids(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = sorted(set(serializer.validated_data["ids"]))
+        found = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            raise ValidationError({"ids": [f"Unknown user ids: {missing}."]})
+        return user_ids
+
+
 class ManagerList(GroupMemberList):
     group_name = "Manager"
 
@@ -92,6 +364,10 @@ class RemoveManager(RemoveGroupMember):
     group_name = "Manager"
 
 
+class ManagerBulk(GroupMemberBulk):
+    group_name = "Manager"
+
+
 class DeliveryCrewList(GroupMemberList):
     group_name = "Delivery Crew"
 
@@ -100,59 +376,216 @@ class RemoveDeliveryCrew(RemoveGroupMember):
     group_name = "Delivery Crew"
 
 
-class CartListCreateDelete(generics.ListCreateAPIView, generics.DestroyAPIView):
+class DeliveryCrewBulk(GroupMemberBulk):
+    group_name = "Delivery Crew"
+
+
+class CartListCreateDelete(
+    IdempotentPostMixin, generics.ListCreateAPIView, generics.DestroyAPIView
+):
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(get_cart_storage().items(request.user))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.instance = get_cart_storage().add(
+            self.request.user,
+            serializer.validated_data["menuitem"],
+            serializer.validated_data["quantity"],
+        )
 
-    def get_object(self):
-        return self.get_queryset()[0]
+    def destroy(self, request, *args, **kwargs):
+        storage = get_cart_storage()
+        items = storage.items(request.user)
+        if not items:
+            raise Http404
+        storage.remove(request.user, items[0].menuitem_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class OrderList(generics.ListCreateAPIView):
-    serializer_class = OrderSerializer
+class OrderList(CoalescedGetMixin, generics.ListCreateAPIView):
     permission_classes = [OrderListPermission]
-    filterset_fields = ["user", "delivery_crew", "status", "date"]
+    filterset_fields = {
+        "user": ["exact"],
+        "delivery_crew": ["exact"],
+        "status": ["exact"],
+        "date": ["exact", "gte", "lte"],
+    }
     ordering_fields = ["date", "total"]
 
+    @cached_property
+    def role(self):
+        groups = set(self.request.user.groups.values_list("name", flat=True))
+        if "Manager" in groups:
+            return "manager"
+        elif "Delivery Crew" in groups:
+            return "delivery_crew"
+        return "customer"
+
+    @property
+    def serves_documents(self):
+        # Customers and delivery crew page through the denormalized read
+        # model; managers still query the orders themselves.
+        return self.role != "manager"
+
+    def get_serializer_class(self):
+        if self.serves_documents:
+            return OrderDocumentSerializer
+        return OrderSerializer
+
+    def coalesce_scope(self, request):
+        if self.role == "manager":
+            return self.role
+        return f"{self.role}:{request.user.pk}"
+
+    def scope(self, queryset):
+        if self.role == "delivery_crew":
+            return queryset.filter(delivery_crew=self.request.user)
+        elif self.role == "customer":
+            return queryset.filter(user=self.request.user)
+        return queryset
+
     def get_queryset(self):
-        user = self.request.user
-        if user.groups.filter(name="Manager").exists():
-            return Order.objects.all()
-        elif user.groups.filter(name="Delivery Crew").exists():
-            return Order.objects.filter(delivery_crew=user)
-        return Order.objects.filter(user=user)
+        if not self.serves_documents:
+            return document_orders()
+        return self.scope(OrderDocument.objects.order_by("order"))
+
+    def searches_archive(self):
+        params = self.request.query_params
+        if not any(params.get(name) for name in ("date", "date__gte", "date__lte")):
+            return False
+        lower = params.get("date") or params.get("date__gte")
+        try:
+            lower = datetime.date.fromisoformat(lower) if lower else None
+        except ValueError:
+            # Leave it to the filterset to reject.
+            return False
+        watermark = archive_watermark()
+        return watermark is not None and (lower is None or lower <= watermark)
+
+    def list(self, request, *args, **kwargs):
+        if not self.searches_archive():
+            return super().list(request, *args, **kwargs)
+
+        # The date range reaches into the archive: page through the hot and
+        # archived documents together.
+        hot = self.filter_queryset(self.scope(OrderDocument.objects.all()))
+        archived = self.filter_queryset(self.scope(ArchivedOrder.objects.all()))
+        ordering = OrderingFilter().get_ordering(request, hot, self) or []
+        rows = (
+            hot.order_by()
+            .values_list("document", "date", "total", "order")
+            .union(
+                archived.order_by().values_list("document", "date", "total", "id"),
+                all=True,
+            )
+            .order_by(*ordering, "order")
+        )
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response([row[0] for row in page])
 
+    @idempotent
     @transaction.atomic
     def post(self, request, *args, **kwargs):
+        get_cart_storage().flush(request.user, evict=True)
         cart = Cart.objects.filter(user=request.user)[0]
+        # A single conditional UPDATE claims the stock, so concurrent checkouts
+        # can never sell more than is left.
+        claimed = MenuItem.objects.filter(
+            pk=cart.menuitem_id, stock__gte=cart.quantity
+        ).update(stock=F("stock") - cart.quantity)
+        if claimed:
+            # Stock is part of the cached catalog.
+            transaction.on_commit(bump_catalog_version)
+        elif not MenuItem.objects.filter(
+            pk=cart.menuitem_id, stock__isnull=True
+        ).exists():
+            return Response(
+                {"detail": "Not enough of this item in stock."},
+                status=status.HTTP_409_CONFLICT,
+            )
         order = Order(
             user=request.user,
             delivery_crew=None,
             status=0,
-            total=cart.quantity * cart.menuitem.price,
-            date=datetime.datetime.now(),
+            total=cart.price,
+            date=datetime.date.today(),
         )
         order_item = OrderItem(
-            order=order, menuitem=cart.menuitem, quantity=cart.quantity
+            order=order,
+            menuitem_id=cart.menuitem_id,
+            quantity=cart.quantity,
+            unit_price=cart.unit_price,
+            price=cart.price,
         )
 
         cart.delete()
         order.save()
         order_item.save()
+        refresh_order_documents([order.id])
+        publish_events(order_events(order.id, order.user_id, None, (None, False)))
+
+        # Follow-up work runs in `manage.py run_jobs`, not in this request.
+        enqueue_order_sales(order, [(cart.menuitem_id, cart.quantity, order.total)])
+        if settings.AUTO_ASSIGN_DELIVERY_CREW:
+            assign_orders.enqueue()
 
         return Response(status=status.HTTP_201_CREATED)
 
 
+class OrderVersionConflict(Exception):
+    def __init__(self, version):
+        self.version = version
+
+
+def order_etag(version) -> str:
+    return f'"{version}"'
+
+
 class OrderDetail(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Order.objects.all()
+    """Orders use optimistic concurrency.
+
+    Responses carry the order's ``version`` and an ``ETag`` with it. Send it
+    back as ``If-Match`` on PUT/PATCH; if the order changed in between, the
+    update is refused with 409 and the current version, and the client should
+    GET the order, re-apply its change and retry. Without ``If-Match`` the
+    update is still conditional on the version read by this request.
+    """
+
+    queryset = document_orders()
     permission_classes = [OrderDetailPermission]
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            response = super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Only orders missing from the hot table are looked up in the
+            # archive. Archived orders are read-only.
+            archived = get_object_or_404(
+                ArchivedOrder.objects.only("document"), pk=kwargs["pk"]
+            )
+            return Response(archived.document)
+        response["ETag"] = order_etag(response.data["version"])
+        return response
+
+    def update(self, request, *args, **kwargs):
+        try:
+            response = super().update(request, *args, **kwargs)
+        except OrderVersionConflict as conflict:
+            return Response(
+                {
+                    "detail": "The order was changed by another request.",
+                    "version": conflict.version,
+                },
+                status=status.HTTP_409_CONFLICT,
+                headers={"ETag": order_etag(conflict.version)},
+            )
+        response["ETag"] = order_etag(response.data["version"])
+        return response
+
     def get_serializer_class(self):
         user = self.request.user
         if is_manager(user):
@@ -160,3 +593,329 @@ class OrderDetail(generics.RetrieveUpdateDestroyAPIView):
         elif is_delivery_crew(user):
             return OrderSerializerForDeliveryCrew
         return OrderSerializer
+
+    def expected_version(self, order):
+        header = self.request.headers.get("If-Match", "*").strip()
+        if header == "*":
+            return order.version
+        version = header.removeprefix("W/").strip('"')
+        if not version.isdigit():
+            raise ValidationError({"If-Match": "Expected an order version."})
+        return int(version)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        order = serializer.instance
+        version = self.expected_version(order)
+        before = (order.delivery_crew_id, order.status)
+        changes = serializer.validated_data
+        if not Order.objects.filter(pk=order.pk, version=version).update(
+            **changes, version=F("version") + 1
+        ):
+            current = Order.objects.filter(pk=order.pk).values_list("version").first()
+            if current is None:
+                raise Http404
+            raise OrderVersionConflict(current[0])
+        for field, value in changes.items():
+            setattr(order, field, value)
+        order.version = version + 1
+        after = (order.delivery_crew_id, order.status)
+        refresh_order_documents([order.id])
+        adjust_crew_loads(crew_load_delta(before, after))
+        publish_events(order_events(order.id, order.user_id, before, after))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        lines = order_lines(instance)
+        # A deleted order is cancelled, so its items go back in stock.
+        restocked = 0
+        for menuitem_id, quantity, _ in lines:
+            restocked += MenuItem.objects.filter(
+                pk=menuitem_id, stock__isnull=False
+            ).update(stock=F("stock") + quantity)
+        if restocked:
+            transaction.on_commit(bump_catalog_version)
+        enqueue_order_sales(instance, lines, sign=-1)
+        adjust_crew_loads(
+            crew_load_delta((instance.delivery_crew_id, instance.status), None)
+        )
+        instance.delete()
+
+
+class OrderBulkUpdate(generics.GenericAPIView):
+    serializer_class = OrderBulkUpdateSerializer
+    permission_classes = [OrderBulkUpdatePermission]
+
+    # The orders are read, locked, in the transaction that writes them, so
+    # the updates and counter deltas are computed from current rows.
+    @transaction.atomic
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = serializer.validated_data["orders"]
+        user = request.user
+        can_assign = user.is_superuser or is_manager(user)
+
+        orders = Order.objects.select_for_update().in_bulk(
+            [change["id"] for change in changes]
+        )
+        crew_ids = {
+            change["delivery_crew"]
+            for change in changes
+            if change.get("delivery_crew") is not None
+        }
+        known_crew = set(
+            User.objects.filter(id__in=crew_ids).values_list("id", flat=True)
+        )
+
+        results = []
+        seen = set()
+        by_fields = {}
+        load_delta = Counter()
+        events = []
+        for change in changes:
+            order_id = change["id"]
+            order = orders.get(order_id)
+            if order is None or not (can_assign or order.delivery_crew_id == user.id):
+                results.append({"id": order_id, "result": "not_found"})
+                continue
+            if order_id in seen:
+                results.append(
+                    {"id": order_id, "result": "invalid", "detail": "Duplicate id."}
+                )
+                continue
+            seen.add(order_id)
+            if "delivery_crew" in change and not can_assign:
+                results.append(
+                    {
+                        "id": order_id,
+                        "result": "forbidden",
+                        "detail": "Delivery crew may only change status.",
+                    }
+                )
+                continue
+            crew_id = change.get("delivery_crew")
+            if crew_id is not None and crew_id not in known_crew:
+                results.append(
+                    {"id": order_id, "result": "invalid", "detail": "Unknown user."}
+                )
+                continue
+            fields = {}
+            if "status" in change:
+                fields["status"] = change["status"]
+            if "delivery_crew" in change:
+                fields["delivery_crew_id"] = crew_id
+            result = {"id": order_id, "result": "updated"}
+            results.append(result)
+            group = by_fields.setdefault(tuple(sorted(fields.items())), {})
+            group[order_id] = (order, result)
+
+        # One UPDATE per distinct set of new values, each conditional on the
+        # versions read above, like OrderDetail, and bumping them once.
+        written = 0
+        for fields, group in by_fields.items():
+            written += Order.objects.filter(
+                reduce(
+                    operator.or_,
+                    (
+                        Q(pk=order_id, version=order.version)
+                        for order_id, (order, _) in group.items()
+                    ),
+                )
+            ).update(**dict(fields), version=F("version") + 1)
+        pending = {
+            order_id: (order, result, dict(fields))
+            for fields, group in by_fields.items()
+            for order_id, (order, result) in group.items()
+        }
+        if written < len(pending):
+            # Some order changed after it was read, which the lock above only
+            # rules out where select_for_update locks. Re-read once: an order
+            # was written here if it is one version on and holds these values.
+            current = {
+                row.pop("id"): row
+                for row in Order.objects.filter(pk__in=pending).values(
+                    "id", "version", "status", "delivery_crew_id"
+                )
+            }
+            for order_id, (order, result, fields) in pending.items():
+                row = current.get(order_id)
+                if not (
+                    row
+                    and row["version"] == order.version + 1
+                    and fields.items() <= row.items()
+                ):
+                    result["result"] = "conflict"
+                    result["detail"] = "The order was changed by another request."
+
+        for order_id, (order, result, fields) in pending.items():
+            if result["result"] != "updated":
+                continue
+            before = (order.delivery_crew_id, order.status)
+            after = (
+                fields.get("delivery_crew_id", order.delivery_crew_id),
+                fields.get("status", order.status),
+            )
+            load_delta.update(crew_load_delta(before, after))
+            events.extend(order_events(order_id, order.user_id, before, after))
+
+        refresh_order_documents(
+            [result["id"] for result in results if result["result"] == "updated"]
+        )
+        adjust_crew_loads(load_delta)
+        publish_events(events)
+
+        return Response({"results": results})
+
+
+class SalesAnalyticsView(generics.ListAPIView):
+    permission_classes = [ManagerOnly]
+
+    def get_date_range(self):
+        serializer = SalesRangeSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def filter_dates(self, queryset):
+        date_range = self.get_date_range()
+        if "start" in date_range:
+            queryset = queryset.filter(date__gte=date_range["start"])
+        if "end" in date_range:
+            queryset = queryset.filter(date__lte=date_range["end"])
+        return queryset
+
+
+class DailySalesList(SalesAnalyticsView):
+    serializer_class = DailySalesSerializer
+
+    def get_queryset(self):
+        return self.filter_dates(DailySales.objects.order_by("date"))
+
+
+class MenuItemSalesList(SalesAnalyticsView):
+    serializer_class = MenuItemSalesSerializer
+
+    def get_queryset(self):
+        return (
+            self.filter_dates(DailyMenuItemSales.objects.all())
+            .values("menuitem")
+            .annotate(
+                title=F("menuitem__title"),
+                quantity=Sum("quantity"),
+                revenue=Sum("revenue"),
+            )
+            .order_by("-revenue", "menuitem")
+        )
+
+
+class CategorySalesList(SalesAnalyticsView):
+    serializer_class = CategorySalesSerializer
+
+    def get_queryset(self):
+        return (
+            self.filter_dates(DailyMenuItemSales.objects.all())
+            .values(category=F("menuitem__category"))
+            .annotate(
+                title=F("menuitem__category__title"),
+                quantity=Sum("quantity"),
+                revenue=Sum("revenue"),
+            )
+            .order_by("-revenue", "category")
+        )
+
+
+class Batch(generics.GenericAPIView):
+    """Run several API requests in one round trip.
+
+    The batch is authenticated and throttled once; each entry then runs
+    through its own view's permissions and throttles, and is admitted by the
+    concurrency limit on its own (see ``run_subrequest``). Entries run in order,
+    unless ``parallel`` is set and all of them are GETs, in which case they
+    run on a thread pool. Each entry is its own transaction, so a failing
+    entry does not undo the ones before it.
+    """
+
+    serializer_class = BatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entries = serializer.validated_data["requests"]
+        parallel = serializer.validated_data["parallel"] and all(
+            entry["method"] == "GET" for entry in entries
+        )
+        if parallel and len(entries) > 1:
+            with ThreadPoolExecutor(
+                min(len(entries), settings.BATCH_MAX_WORKERS),
+                thread_name_prefix="batch",
+            ) as pool:
+                responses = list(
+                    pool.map(partial(run_subrequest_in_thread, request), entries)
+                )
+        else:
+            responses = [run_subrequest(request, entry) for entry in entries]
+        return Response({"responses": responses})
+
+
+def get_event_filter(user, order_id=None):
+    sees_all = user.is_superuser or is_manager(user)
+    is_crew = not sees_all and is_delivery_crew(user)
+
+    def accepts(event):
+        if order_id is not None and event["order"] != order_id:
+            return False
+        if sees_all:
+            return True
+        if is_crew:
+            return user.id in (
+                event["delivery_crew"],
+                event.get("previous_delivery_crew"),
+            )
+        return event["user"] == user.id
+
+    return accepts
+
+
+async def order_event_stream(request):
+    try:
+        credentials = await sync_to_async(TokenAuthentication().authenticate)(request)
+    except exceptions.AuthenticationFailed as exc:
+        credentials = None
+        detail = str(exc.detail)
+    else:
+        detail = "Authentication credentials were not provided."
+    if credentials is None:
+        return JsonResponse({"detail": detail}, status=401)
+
+    order_id = request.GET.get("order")
+    if order_id is not None and not order_id.isdigit():
+        return JsonResponse({"detail": "Invalid order id."}, status=400)
+    accepts = await sync_to_async(get_event_filter)(
+        credentials[0], int(order_id) if order_id else None
+    )
+
+    async def stream():
+        subscription = broker.subscribe(accepts)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), settings.ORDER_EVENTS_KEEPALIVE
+                    )
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield (
+                    f"id: {event['id']}\n"
+                    f"event: {event['type']}\n"
+                    f"data: {json.dumps(event)}\n\n"
+                )
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
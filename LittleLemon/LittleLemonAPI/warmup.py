@@ -0,0 +1,67 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.http import HttpRequest
+from django.urls import resolve
+
+from .batch import run_subrequest
+from .helpers import get_catalog_version, get_group_id
+
+logger = logging.getLogger(__name__)
+
+
+def warm_group_ids() -> None:
+    for name in ("Manager", "Delivery Crew"):
+        try:
+            get_group_id(name)
+        except Group.DoesNotExist:
+            pass
+
+
+def warm_requests() -> None:
+    """Serve WARMUP_PATHS in-process, as an unsaved superuser.
+
+    This imports the views and serializers, builds the filtersets and
+    renderers, and fills the shared caches the way the first real requests
+    would, without writing anything.
+    """
+    hosts = [host for host in settings.ALLOWED_HOSTS if "*" not in host]
+    request = HttpRequest()
+    request.META = {
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": hosts[0].lstrip(".") if hosts else "localhost",
+    }
+    request.user = User(username="warmup", is_superuser=True, is_staff=True)
+    request.auth = None
+    for path in settings.WARMUP_PATHS:
+        response = run_subrequest(request, {"method": "GET", "path": path})
+        if response["status"] != 200:
+            logger.warning("Warm-up of %s returned %s", path, response["status"])
+
+
+def warm_up() -> dict:
+    """Preload what a new worker's first requests would pay for.
+
+    Returns the seconds each step that succeeded took. A failing step is
+    logged and skipped rather than raised, since this runs while wsgi.py or
+    asgi.py is imported: the worker still starts, with a colder cache.
+    """
+    steps = {
+        "urls": lambda: resolve("/api/menu-items/"),
+        "group_ids": warm_group_ids,
+        "catalog_version": get_catalog_version,
+        "requests": warm_requests,
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings